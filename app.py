@@ -10,34 +10,60 @@ Each agent's instructions are loaded from spec files in ./specs/.
 
 import asyncio
 import base64
+import functools
+import hashlib
+import json
 import os
+import random
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterable, Awaitable, Callable
 from uuid import uuid4
 
+# Cold-start accounting: everything from here on counts towards the "imports" phase
+_MODULE_LOAD_STARTED = time.perf_counter()
+
 from dotenv import load_dotenv
 from typing_extensions import Never
 
 from agent_framework import (
+    AgentRunResponse,
     AgentRunResponseUpdate,
     AgentRunUpdateEvent,
+    BaseAgent,
     ChatAgent,
     ChatMessage,
+    CheckpointStorage,
     Executor,
+    FileCheckpointStorage,
     Role,
     TextContent,
+    Workflow,
     WorkflowBuilder,
+    WorkflowCheckpoint,
     WorkflowContext,
     WorkflowOutputEvent,
     WorkflowStatusEvent,
     WorkflowRunState,
     handler,
 )
-from agent_framework.azure import AzureAIClient
-from azure.identity import DefaultAzureCredential as SyncDefaultAzureCredential
-from azure.identity import get_bearer_token_provider
-from azure.identity.aio import DefaultAzureCredential
-from openai import AsyncAzureOpenAI
+
+# The Azure / OpenAI client stack takes seconds to import, so it is only
+# imported when the workflow is first built (see build_workflow_factory)
+if TYPE_CHECKING:
+    from azure.identity.aio import DefaultAzureCredential
+    from openai import AsyncAzureOpenAI, AsyncOpenAI
 
 load_dotenv(override=True)
 
@@ -51,7 +77,138 @@ OUTPUT_DIR = Path(__file__).parent / "generated_images"
 
 MAX_REVIEW_CYCLES = 3
 
+# Shared HTTP connection pool used by all agents and the image client
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HEADLINEART_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_KEEPALIVE_SECONDS = float(os.environ.get("HEADLINEART_HTTP_KEEPALIVE_SECONDS", "60"))
+
+# Foundry OpenAI-compatible API version (matches AIProjectClient.get_openai_client)
+FOUNDRY_API_VERSION = "2025-11-15-preview"
+
+# Forward each agent's output token-by-token to streaming HTTP clients instead
+# of a 200-char preview once the stage has finished
+STREAM_TOKENS = os.environ.get("HEADLINEART_STREAM_TOKENS", "false").lower() == "true"
+
+# Image generation scheduler shared by all runs: a token bucket matched to the
+# deployment's images-per-minute quota (0 = unlimited) with a small burst, a
+# bounded wait queue, and jittered exponential backoff for throttling (429)
+# and transient errors
+IMAGE_RATE_PER_MINUTE = float(os.environ.get("HEADLINEART_IMAGE_RATE_PER_MINUTE", "6"))
+IMAGE_BURST = int(os.environ.get("HEADLINEART_IMAGE_BURST", "2"))
+IMAGE_QUEUE_SIZE = int(os.environ.get("HEADLINEART_IMAGE_QUEUE_SIZE", "32"))
+IMAGE_MAX_RETRIES = int(os.environ.get("HEADLINEART_IMAGE_MAX_RETRIES", "4"))
+IMAGE_BACKOFF_SECONDS = float(os.environ.get("HEADLINEART_IMAGE_BACKOFF_SECONDS", "2"))
+
+# Hedged image generation: if the primary prompt has not come back after this
+# many seconds, race the fallback prompt against it and keep the first image
+# (0 = start both at once; empty = off, fallback only after a rejection)
+IMAGE_HEDGE_DELAY = (
+    float(os.environ["HEADLINEART_IMAGE_HEDGE_DELAY"])
+    if os.environ.get("HEADLINEART_IMAGE_HEDGE_DELAY", "").strip()
+    else None
+)
 
+# Local pre-moderation of image prompts: risky names, brands and violence
+# terms from the blocklist are rewritten or stripped before the remote call
+# (empty path = off; relative to this file), and prompts are cut at a
+# sentence boundary
+IMAGE_BLOCKLIST = os.environ.get("HEADLINEART_IMAGE_BLOCKLIST", "specs/image_blocklist.txt")
+IMAGE_PROMPT_MAX_CHARS = int(os.environ.get("HEADLINEART_IMAGE_PROMPT_MAX_CHARS", "800"))
+
+# Reuse a stored image when the new prompt is a near-duplicate of a recent
+# one (estimated Jaccard similarity of character shingles, 0-1; 0 = off).
+# The cache keeps hard links to past images under HEADLINEART_IMAGE_REUSE_DIR
+# (default: generated_images/reuse) and evicts the least recently used first.
+IMAGE_REUSE_THRESHOLD = float(os.environ.get("HEADLINEART_IMAGE_REUSE_THRESHOLD", "0"))
+IMAGE_REUSE_MAX_ENTRIES = int(os.environ.get("HEADLINEART_IMAGE_REUSE_MAX_ENTRIES", "200"))
+IMAGE_REUSE_MAX_MB = float(os.environ.get("HEADLINEART_IMAGE_REUSE_MAX_MB", "500"))
+IMAGE_REUSE_DIR = os.environ.get("HEADLINEART_IMAGE_REUSE_DIR", "")
+
+# Gallery manifest: every finished artwork appends a record (image path,
+# hash, sizes, prompt, caption, hashtags, theme, review scores, timings and a
+# small thumbnail) to an append-only SQLite file, listed with "/gallery"
+GALLERY = os.environ.get("HEADLINEART_GALLERY", "false").lower() == "true"
+# Empty = generated_images/gallery.db
+GALLERY_DB = os.environ.get("HEADLINEART_GALLERY_DB", "")
+# Longest side of the stored thumbnail in pixels (0 = none; requires Pillow)
+GALLERY_THUMBNAIL_SIZE = int(os.environ.get("HEADLINEART_GALLERY_THUMBNAIL_SIZE", "256"))
+GALLERY_PAGE_SIZE = int(os.environ.get("HEADLINEART_GALLERY_PAGE_SIZE", "20"))
+
+# Worker threads for decoding and writing generated images off the event loop
+IMAGE_IO_WORKERS = int(os.environ.get("HEADLINEART_IMAGE_IO_WORKERS", "4"))
+
+# Derived image variants, e.g. "post=jpeg:1080:90,thumb=webp:256:80"
+# (name=format:max_side[:quality]); empty disables them. Requires Pillow.
+IMAGE_VARIANTS = os.environ.get("HEADLINEART_IMAGE_VARIANTS", "")
+VARIANT_WORKERS = int(os.environ.get("HEADLINEART_VARIANT_WORKERS", "2"))
+
+# Maximum number of workflow runs the HTTP server executes at the same time;
+# further requests wait for a free slot
+MAX_CONCURRENT_RUNS = int(os.environ.get("HEADLINEART_MAX_CONCURRENT_RUNS", "8"))
+
+# "transcript": every stage sees the full conversation so far (original behavior)
+# "artifacts": every stage sees only the upstream artifacts it needs (see STAGE_INPUTS)
+PIPELINE_MODE = os.environ.get("HEADLINEART_PIPELINE_MODE", "transcript").lower()
+
+# Token budget (~4 chars/token) of a run's transcript: past it, the oldest stage
+# outputs and review messages that a newer one has superseded are replaced by a
+# short summary (TRANSCRIPT_SUMMARY_CHARS of their text; 0 drops the text).
+# 0 keeps the full transcript.
+TRANSCRIPT_TOKEN_BUDGET = int(os.environ.get("HEADLINEART_TRANSCRIPT_TOKEN_BUDGET", "0"))
+TRANSCRIPT_SUMMARY_CHARS = int(os.environ.get("HEADLINEART_TRANSCRIPT_SUMMARY_CHARS", "300"))
+
+# Rerun only the stages owning a failing review category (instead of always
+# restarting at the Creative Director)
+INCREMENTAL_REVIEW = os.environ.get("HEADLINEART_INCREMENTAL_REVIEW", "true").lower() == "true"
+
+# "sequential": Art Generator → Copywriter (original behavior)
+# "parallel": Art Generator and Copywriter both run from the Creative Director's
+#             brief at the same time and are joined before the Quality Reviewer
+TOPOLOGY = os.environ.get("HEADLINEART_TOPOLOGY", "sequential").lower()
+
+# Batch mode ("/batch ..."): creative branches running at the same time, and
+# the largest number of artworks one batch may request
+BATCH_CONCURRENCY = int(os.environ.get("HEADLINEART_BATCH_CONCURRENCY", "3"))
+BATCH_MAX_SIZE = int(os.environ.get("HEADLINEART_BATCH_MAX_SIZE", "10"))
+
+# NewsScout results are reused across runs for the same trigger and day for
+# this many seconds (0 disables the cache). For a further STALE seconds a
+# cached result is still served while a background run refreshes it.
+SCOUT_CACHE_TTL = float(os.environ.get("HEADLINEART_SCOUT_CACHE_TTL", "1800"))
+SCOUT_CACHE_STALE = float(os.environ.get("HEADLINEART_SCOUT_CACHE_STALE", "0"))
+# Optional directory that persists the cache across restarts ("" = memory only)
+SCOUT_CACHE_DIR = os.environ.get("HEADLINEART_SCOUT_CACHE_DIR", "")
+
+# Collapse near-duplicate stories in the News Scout output before the News
+# Analyst sees them (MinHash similarity of the words of headline + summary,
+# 0-1; 0 = off)
+STORY_DEDUP_THRESHOLD = float(os.environ.get("HEADLINEART_STORY_DEDUP_THRESHOLD", "0.35"))
+
+# Reuse the output of the analyst / creative stages when their exact input,
+# spec file and model were seen before (e.g. replays after a downstream failure)
+STAGE_CACHE = os.environ.get("HEADLINEART_STAGE_CACHE", "false").lower() == "true"
+STAGE_CACHE_MEMORY_ENTRIES = int(os.environ.get("HEADLINEART_STAGE_CACHE_MEMORY_ENTRIES", "256"))
+# Optional SQLite file for a persistent tier ("" = memory only), capped at MAX_MB
+STAGE_CACHE_DB = os.environ.get("HEADLINEART_STAGE_CACHE_DB", "")
+STAGE_CACHE_MAX_MB = float(os.environ.get("HEADLINEART_STAGE_CACHE_MAX_MB", "100"))
+
+# Durable checkpoints after every superstep (i.e. after each executor), so a
+# failed or interrupted run can be resumed: a directory of JSON files or a
+# SQLite file. Leave both empty to disable.
+CHECKPOINT_DIR = os.environ.get("HEADLINEART_CHECKPOINT_DIR", "")
+CHECKPOINT_DB = os.environ.get("HEADLINEART_CHECKPOINT_DB", "")
+
+# Metrics export: "" (in-process only), "prometheus" (text format on
+# http://127.0.0.1:<port>/metrics) or "log" (periodic summary on stdout)
+METRICS_EXPORTER = os.environ.get("HEADLINEART_METRICS_EXPORTER", "").lower()
+METRICS_PORT = int(os.environ.get("HEADLINEART_METRICS_PORT", "9464"))
+METRICS_LOG_INTERVAL = float(os.environ.get("HEADLINEART_METRICS_LOG_INTERVAL", "60"))
+
+# Model prices (USD per 1K tokens) for the cost counters; 0 leaves cost at 0
+PRICE_INPUT_PER_1K = float(os.environ.get("HEADLINEART_PRICE_INPUT_PER_1K", "0"))
+PRICE_OUTPUT_PER_1K = float(os.environ.get("HEADLINEART_PRICE_OUTPUT_PER_1K", "0"))
+
+
+@functools.cache
 def _load_spec(filename: str) -> str:
     """Load agent instructions from a spec markdown file."""
     spec_path = SPECS_DIR / filename
@@ -61,247 +218,2378 @@ def _load_spec(filename: str) -> str:
 
 
 # ---------------------------------------------------------------------------
-# Executor 1: News Scout
+# Startup timing
 # ---------------------------------------------------------------------------
-class NewsScoutExecutor(Executor):
-    """Scans news sources and collects top daily stories."""
+# Seconds spent per cold-start phase, in the order the phases ran
+STARTUP_TIMINGS: dict[str, float] = {"imports": time.perf_counter() - _MODULE_LOAD_STARTED}
+
+
+@contextmanager
+def _startup_phase(name: str):
+    """Add the time spent in the block to STARTUP_TIMINGS[name]."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[name] = STARTUP_TIMINGS.get(name, 0.0) + time.perf_counter() - started
+
+
+def _format_startup_timings() -> str:
+    """One-line cold-start report, e.g. "imports 0.71s · credential 0.01s · ... · total 2.40s"."""
+    parts = [f"{name} {seconds:.2f}s" for name, seconds in STARTUP_TIMINGS.items()]
+    return " · ".join(parts + [f"total {sum(STARTUP_TIMINGS.values()):.2f}s"])
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class _Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Metrics:
+    """In-process registry of labelled counters, gauges and histograms.
+
+    Only touched from the event loop, so no locking is needed. Metrics must be
+    declared with describe() before use.
+    """
+
+    def __init__(self):
+        self._kinds: dict[str, str] = {}
+        self._help: dict[str, str] = {}
+        self._buckets: dict[str, tuple[float, ...]] = {}
+        self._values: dict[str, dict[tuple, float | _Histogram]] = defaultdict(dict)
+
+    def describe(self, name: str, kind: str, help: str, buckets: tuple[float, ...] = _LATENCY_BUCKETS) -> None:
+        """Declare a metric: kind is "counter", "gauge" or "histogram"."""
+        self._kinds[name] = kind
+        self._help[name] = help
+        self._buckets[name] = buckets
+
+    @staticmethod
+    def _key(labels: dict[str, str]) -> tuple:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[name][key] = self._values[name].get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        self._values[name][self._key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        series = self._values[name]
+        key = self._key(labels)
+        if key not in series:
+            series[key] = _Histogram(self._buckets[name])
+        series[key].observe(value)
+
+    @contextmanager
+    def span(self, name: str, **labels: str):
+        """Time the block into histogram `name`, labelled with outcome ok/error."""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.observe(name, time.perf_counter() - started, outcome=outcome, **labels)
+
+    def series(self, name: str) -> dict[tuple, float | _Histogram]:
+        """All label sets recorded for a metric."""
+        return dict(self._values.get(name, {}))
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+
+        def fmt(labels: tuple, extra: tuple = ()) -> str:
+            pairs = [f'{k}="{v}"' for k, v in (*labels, *extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        for name, kind in self._kinds.items():
+            lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in self._values.get(name, {}).items():
+                if isinstance(value, _Histogram):
+                    for bound, count in zip(value.buckets, value.counts):
+                        lines.append(f"{name}_bucket{fmt(labels, (('le', bound),))} {count}")
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', '+Inf'),))} {value.count}")
+                    lines.append(f"{name}_sum{fmt(labels)} {value.sum}")
+                    lines.append(f"{name}_count{fmt(labels)} {value.count}")
+                else:
+                    lines.append(f"{name}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+METRICS.describe("headlineart_run_seconds", "histogram", "End-to-end workflow run latency")
+METRICS.describe("headlineart_executor_seconds", "histogram", "Time spent in each executor handler")
+METRICS.describe("headlineart_agent_seconds", "histogram", "Latency of agent.run / agent.run_stream per agent")
+METRICS.describe("headlineart_agent_tokens_total", "counter", "Tokens per agent and direction (input/output)")
+METRICS.describe("headlineart_agent_cost_usd_total", "counter", "Estimated model cost per agent (USD)")
+METRICS.describe(
+    "headlineart_review_cycles", "histogram", "Review cycles needed per run",
+    buckets=tuple(float(n) for n in range(1, MAX_REVIEW_CYCLES + 1)),
+)
+METRICS.describe("headlineart_review_verdicts_total", "counter", "Quality Reviewer verdicts")
+METRICS.describe("headlineart_image_attempts_total", "counter", "images.generate attempts by prompt and outcome")
+METRICS.describe("headlineart_image_generate_seconds", "histogram", "images.generate latency by prompt")
+METRICS.describe("headlineart_image_errors_total", "counter", "images.generate errors by kind")
+METRICS.describe("headlineart_image_retries_total", "counter", "images.generate retries after throttling/transient errors")
+METRICS.describe("headlineart_image_precheck_total", "counter", "Image prompts checked locally (clean/rewritten)")
+METRICS.describe("headlineart_image_precheck_hits_total", "counter", "Blocklist matches in image prompts by category")
+METRICS.describe(
+    "headlineart_image_precheck_rewrites_accepted_total",
+    "counter",
+    "Rewritten image prompts accepted on the first call (a proxy for rejections the pre-check prevented)",
+)
+METRICS.describe("headlineart_image_reuse_total", "counter", "Image reuse cache lookups (hit/miss) and evictions")
+METRICS.describe("headlineart_image_queue_depth", "gauge", "Image requests waiting for a rate-limit token")
+METRICS.describe(
+    "headlineart_image_hedge_total",
+    "counter",
+    "Hedged image generations by result (skipped/primary_won/hedge_won/both_failed)",
+)
+METRICS.describe("headlineart_image_queue_wait_seconds", "histogram", "Time image requests wait for a rate-limit token")
+METRICS.describe(
+    "headlineart_event_loop_lag_seconds", "histogram", "Event-loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+METRICS.describe("headlineart_active_runs", "gauge", "Workflow runs currently executing")
+METRICS.describe("headlineart_story_dedup_total", "counter", "News Scout stories kept or merged into a duplicate")
+METRICS.describe(
+    "headlineart_transcript_compacted_total", "counter", "Superseded transcript messages summarized to fit the token budget"
+)
+METRICS.describe("headlineart_stage_cache_total", "counter", "Stage memo lookups by stage and tier (memory/disk/miss)")
+METRICS.describe("headlineart_scout_cache_total", "counter", "NewsScout cache lookups (hit/stale/joined/miss) and refreshes")
+
+
+def _instrumented(handler_func):
+    """Record the handler's duration in headlineart_executor_seconds and the run's
+    STAGE_SECONDS_KEY (use below @handler)."""
+
+    @functools.wraps(handler_func)
+    async def wrapper(self, message, ctx):
+        started = time.perf_counter()
+        with METRICS.span("headlineart_executor_seconds", executor=self.id):
+            result = await handler_func(self, message, ctx)
+        # Per-run totals too, for the gallery record (see STAGE_SECONDS_KEY)
+        elapsed = time.perf_counter() - started
+        await _update_run_state(
+            ctx, STAGE_SECONDS_KEY, {}, lambda seconds: seconds.update({self.id: seconds.get(self.id, 0.0) + elapsed})
+        )
+        return result
+
+    return wrapper
+
+
+def _record_agent_usage(agent: str, input_tokens: int, output_tokens: int) -> None:
+    METRICS.inc("headlineart_agent_tokens_total", input_tokens, agent=agent, direction="input")
+    METRICS.inc("headlineart_agent_tokens_total", output_tokens, agent=agent, direction="output")
+    cost = input_tokens / 1000 * PRICE_INPUT_PER_1K + output_tokens / 1000 * PRICE_OUTPUT_PER_1K
+    METRICS.inc("headlineart_agent_cost_usd_total", cost, agent=agent)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Sample how late the event loop wakes up a sleeping task, forever."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        METRICS.observe("headlineart_event_loop_lag_seconds", max(loop.time() - started - interval, 0.0))
+
+
+# Strong references to the metrics background tasks (the loop only keeps weak ones)
+_METRICS_TASKS: set[asyncio.Task] = set()
+
+
+class MetricsExporter(ABC):
+    """Publishes METRICS somewhere; start() is called once the event loop runs."""
+
+    @abstractmethod
+    async def start(self, metrics: Metrics) -> None:
+        """Begin publishing `metrics` (e.g. start a server or a background task)."""
+
+
+class PrometheusExporter(MetricsExporter):
+    """Serves the registry in Prometheus text format on http://host:port/metrics."""
+
+    def __init__(self, port: int = METRICS_PORT, host: str = "127.0.0.1"):
+        self.port = port
+        self.host = host
+
+    async def start(self, metrics: Metrics) -> None:
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # skip headers
+            if request_line.split(b" ")[1:2] == [b"/metrics"]:
+                status, body = "200 OK", metrics.render_prometheus().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+            writer.close()
+
+        self._server = await asyncio.start_server(handle, self.host, self.port)
+        print(f"[Metrics] Prometheus metrics on http://{self.host}:{self.port}/metrics")
+
+
+class LogExporter(MetricsExporter):
+    """Prints mean time per executor and token totals every `interval` seconds."""
+
+    def __init__(self, interval: float = METRICS_LOG_INTERVAL):
+        self.interval = interval
+
+    async def start(self, metrics: Metrics) -> None:
+        _METRICS_TASKS.add(asyncio.create_task(self._run(metrics)))
+
+    async def _run(self, metrics: Metrics) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            print(f"[Metrics] {_format_metrics_summary(metrics)}")
+
+
+def _format_metrics_summary(metrics: Metrics) -> str:
+    """Mean executor time and tokens per agent, e.g. "NewsScout 4.10s/1830 tok · ..."."""
+    seconds: dict[str, list[float]] = defaultdict(lambda: [0.0, 0])
+    for labels, hist in metrics.series("headlineart_executor_seconds").items():
+        executor = dict(labels)["executor"]
+        seconds[executor][0] += hist.sum
+        seconds[executor][1] += hist.count
+    tokens: dict[str, float] = defaultdict(float)
+    for labels, value in metrics.series("headlineart_agent_tokens_total").items():
+        tokens[dict(labels)["agent"]] += value
+    parts = [
+        f"{executor} {total / count:.2f}s/{int(tokens.get(executor, 0))} tok"
+        for executor, (total, count) in seconds.items()
+    ]
+    return " · ".join(parts) or "no runs yet"
+
+
+# Exporter name (HEADLINEART_METRICS_EXPORTER) → factory; register custom exporters here
+METRICS_EXPORTERS: dict[str, Callable[[], MetricsExporter]] = {
+    "prometheus": PrometheusExporter,
+    "log": LogExporter,
+}
+
+
+async def start_metrics() -> None:
+    """Start the event-loop lag monitor and the configured exporter."""
+    if METRICS_EXPORTER and METRICS_EXPORTER not in METRICS_EXPORTERS:
+        raise ValueError(
+            f"HEADLINEART_METRICS_EXPORTER must be one of {', '.join(METRICS_EXPORTERS)} or empty, "
+            f"got '{METRICS_EXPORTER}'"
+        )
+    _METRICS_TASKS.add(asyncio.create_task(monitor_event_loop_lag()))
+    if METRICS_EXPORTER:
+        await METRICS_EXPORTERS[METRICS_EXPORTER]().start(METRICS)
+
+
+# ---------------------------------------------------------------------------
+# Run-scoped state and artifact handoff
+# ---------------------------------------------------------------------------
+# Shared-state keys (the workflow clears shared state at the start of every run)
+ARTIFACTS_KEY = "headlineart.artifacts"
+PROMPT_TOKENS_KEY = "headlineart.prompt_tokens"
+PENDING_BRANCHES_KEY = "headlineart.pending_branches"
+BRANCH_RESULTS_KEY = "headlineart.branch_results"
+REVIEW_COUNT_KEY = "headlineart.review_count"
+STAGE_SECONDS_KEY = "headlineart.stage_seconds"
+
+# Artifacts each stage receives in "artifacts" mode (the specs' "Input" sections
+# describe what is true in every mode). An empty tuple means the stage works
+# from the trigger message itself.
+STAGE_INPUTS: dict[str, tuple[str, ...]] = {
+    "NewsScout": (),
+    "NewsAnalyst": ("NewsScout",),
+    "CreativeDirector": ("NewsAnalyst", "BatchDirection"),
+    "ArtGenerator": ("CreativeDirector",),
+    "Copywriter": ("NewsAnalyst", "CreativeDirector", "ArtGenerator"),
+    "QualityReviewer": ("NewsAnalyst", "CreativeDirector", "ArtGenerator", "Copywriter"),
+    "ImageCreator": ("CreativeDirector", "ArtGenerator", "QualityReviewer"),
+}
+
+# In the parallel topology the Copywriter runs alongside the Art Generator and
+# writes from the brief alone
+PARALLEL_STAGE_INPUTS: dict[str, tuple[str, ...]] = {
+    **STAGE_INPUTS,
+    "Copywriter": ("NewsAnalyst", "CreativeDirector"),
+}
+
+ARTIFACT_TITLES: dict[str, str] = {
+    "NewsScout": "News stories",
+    "NewsAnalyst": "Curated news analysis",
+    "CreativeDirector": "Art concept brief",
+    "ArtGenerator": "Image generation package",
+    "Copywriter": "Instagram content package",
+    "QualityReviewer": "Quality review",
+    "BatchDirection": "Creative direction for this artwork",
+}
+
+# Stages that receive the reviewer's feedback (and their own previous draft) on revision
+REVISABLE_STAGES = ("CreativeDirector", "ArtGenerator", "Copywriter")
+
+# Stages that run side by side in the parallel topology
+BRANCH_STAGES = ("ArtGenerator", "Copywriter")
+
+
+def _stage_inputs(stage: str) -> tuple[str, ...]:
+    """Artifacts a stage receives in "artifacts" mode for the configured TOPOLOGY."""
+    inputs = PARALLEL_STAGE_INPUTS if TOPOLOGY == "parallel" else STAGE_INPUTS
+    return inputs.get(stage, ())
+
+
+async def _get_run_state(ctx: WorkflowContext, key: str, default):
+    """Read a run-scoped value from the workflow's shared state."""
+    if await ctx.shared_state.has(key):
+        return await ctx.get_shared_state(key)
+    return default
+
+
+async def _update_run_state(ctx: WorkflowContext, key: str, default, update) -> None:
+    """Atomically read-modify-write a run-scoped value (parallel branches share it)."""
+    async with ctx.shared_state.hold() as state:
+        value = await state.get_within_hold(key) if await state.has_within_hold(key) else default
+        update(value)
+        await state.set_within_hold(key, value)
+
+
+def _estimate_tokens(messages: list[ChatMessage]) -> int:
+    """Rough token estimate (~4 chars/token) for when the service reports no usage."""
+    return sum(len(msg.text or "") for msg in messages) // 4
+
+
+def _artifact_prompt(stage: str, messages: list[ChatMessage], artifacts: dict[str, str]) -> list[ChatMessage]:
+    """Build a stage's prompt from the trigger and only its input artifacts (see STAGE_INPUTS).
+
+    The trigger always leads, so the style and intent of the request reach
+    every stage as they do in transcript mode.
+    """
+    inputs = _stage_inputs(stage)
+    if not inputs:
+        return list(messages)
+
+    trigger = next((msg for msg in messages if msg.role == Role.USER), None)
+    prompt = [trigger] if trigger is not None else []
+    prompt += [
+        ChatMessage(role=Role.USER, text=f"## {ARTIFACT_TITLES[name]} (from {name})\n\n{artifacts[name]}")
+        for name in inputs
+        if name in artifacts
+    ]
+    if stage in REVISABLE_STAGES and "QualityReviewer" in artifacts:
+        if stage in artifacts:
+            prompt.append(
+                ChatMessage(role=Role.USER, text=f"## Your previous version\n\n{artifacts[stage]}")
+            )
+        prompt.append(
+            ChatMessage(
+                role=Role.USER,
+                text=(
+                    "The quality reviewer has requested revisions. "
+                    f"Please revise your work based on this feedback:\n\n{artifacts['QualityReviewer']}"
+                ),
+            )
+        )
+    return prompt
+
+
+def _format_prompt_tokens(prompt_tokens: dict[str, list[int]]) -> str:
+    """One-line per-stage prompt-token summary for the final package."""
+    parts = [f"{stage} {sum(counts)}" for stage, counts in prompt_tokens.items()]
+    total = sum(sum(counts) for counts in prompt_tokens.values())
+    return f"Prompt tokens ({PIPELINE_MODE} mode): " + " · ".join(parts) + f" · total {total}"
+
+
+# ---------------------------------------------------------------------------
+# Run transcript: append-only log with stage and control-marker indexes
+# ---------------------------------------------------------------------------
+# Prefixes of the Quality Reviewer's routing messages
+FINAL_APPROVED_MARKER = "[FINAL_APPROVED]"
+REVISION_MARKER = "[REVISION"
+CONTROL_MARKERS = (FINAL_APPROVED_MARKER, REVISION_MARKER)
+
+# Start of the summary that replaces a compacted message
+_SUPERSEDED_PREFIX = "[Superseded "
+
+
+def _control_marker(msg: ChatMessage) -> str | None:
+    """The control marker a user message starts with, if any."""
+    if msg.role != Role.USER:
+        return None
+    text = msg.text or ""
+    return next((marker for marker in CONTROL_MARKERS if text.startswith(marker)), None)
+
+
+class Transcript(list):
+    """A run's conversation: an append-only log indexed by stage and control marker.
+
+    A list subclass, so it travels through the list[ChatMessage] handlers,
+    edge conditions and agent calls unchanged. Messages are never modified
+    in place, which makes copies copy-on-write at message granularity:
+    fork() — and copy.copy/copy.deepcopy, which the workflow runs on every
+    executor input for its events — shares the messages and the index
+    tuples and only copies the references. A checkpoint restores a plain
+    list; handlers re-wrap it with Transcript.of().
+
+    With TRANSCRIPT_TOKEN_BUDGET set, an append that takes the transcript
+    past the budget compacts the oldest superseded messages (see compact()).
+    Parallel branches fork with compaction off: _merge_branches matches their
+    shared prefix message by message, so only the merged transcript compacts.
+    """
+
+    __slots__ = ("_positions", "_last_user", "_chars", "_compacts")
+
+    def __init__(self, messages=()):
+        super().__init__()
+        # Stage name (author_name) or control marker → positions, oldest first
+        self._positions: dict[str, tuple[int, ...]] = {}
+        self._last_user = -1
+        self._chars = 0
+        self._compacts = True
+        self.extend(messages)
+
+    @classmethod
+    def of(cls, messages: list[ChatMessage]) -> "Transcript":
+        """`messages` itself if it already is a Transcript, else a new one holding them."""
+        return messages if isinstance(messages, cls) else cls(messages)
+
+    def fork(self, compacts: bool = True) -> "Transcript":
+        """An independent copy sharing this transcript's messages and index tuples.
+
+        With `compacts` False the copy never compacts (see TRANSCRIPT_TOKEN_BUDGET).
+        """
+        clone = Transcript.__new__(Transcript)
+        list.extend(clone, self)
+        clone._positions = dict(self._positions)
+        clone._last_user = self._last_user
+        clone._chars = self._chars
+        clone._compacts = compacts
+        return clone
+
+    def __copy__(self) -> "Transcript":
+        return self.fork(self._compacts)
+
+    def __deepcopy__(self, memo) -> "Transcript":
+        return self.fork(self._compacts)
+
+    def __reduce__(self):
+        return Transcript, (list(self),)
+
+    @property
+    def tokens(self) -> int:
+        """Estimated size, on the same ~4 chars/token basis as _estimate_tokens."""
+        return self._chars // 4
+
+    def append(self, msg: ChatMessage) -> None:
+        position = len(self)
+        list.append(self, msg)
+        self._chars += len(msg.text or "")
+        key = _control_marker(msg) or (msg.author_name if msg.role == Role.ASSISTANT else None)
+        if key is not None:
+            self._positions[key] = (*self._positions.get(key, ()), position)
+        if msg.role == Role.USER:
+            self._last_user = position
+        if self._compacts and TRANSCRIPT_TOKEN_BUDGET > 0 and self.tokens > TRANSCRIPT_TOKEN_BUDGET:
+            self.compact(TRANSCRIPT_TOKEN_BUDGET)
+
+    def extend(self, messages) -> None:
+        for msg in messages:
+            self.append(msg)
+
+    def __iadd__(self, messages) -> "Transcript":
+        self.extend(messages)
+        return self
+
+    def _append_only(self, *args, **kwargs):
+        raise TypeError("Transcript is append-only; use replaced() for a rewritten copy")
+
+    __setitem__ = __delitem__ = __imul__ = insert = pop = remove = clear = sort = reverse = _append_only
+
+    def replaced(self, position: int, msg: ChatMessage) -> "Transcript":
+        """A copy with the message at `position` swapped for `msg` (this transcript is unchanged)."""
+        return Transcript([*self[:position], msg, *self[position + 1 :]])
+
+    def latest(self, key: str) -> ChatMessage | None:
+        """Latest output of stage `key`, or latest message starting with control marker `key`."""
+        positions = self._positions.get(key)
+        return self[positions[-1]] if positions else None
+
+    def control(self) -> str | None:
+        """The control marker the most recent user message starts with, if any."""
+        return _control_marker(self[self._last_user]) if self._last_user >= 0 else None
+
+    def compact(self, budget: int) -> int:
+        """Summarize the oldest superseded messages until the transcript fits `budget` tokens.
+
+        A message is superseded once its stage (or its control marker) has a
+        newer message; the trigger, batch direction and the latest message of
+        every stage are always kept in full. Returns the number compacted.
+        """
+        superseded = sorted(
+            (position, key) for key, positions in self._positions.items() for position in positions[:-1]
+        )
+        compacted = 0
+        for position, key in superseded:
+            if self.tokens <= budget:
+                break
+            msg = self[position]
+            text = msg.text or ""
+            if text.startswith(_SUPERSEDED_PREFIX):
+                continue
+            label = f"{key} output" if msg.role == Role.ASSISTANT else "review message"
+            summary = _truncate_prompt(text, TRANSCRIPT_SUMMARY_CHARS) if TRANSCRIPT_SUMMARY_CHARS > 0 else ""
+            if summary and len(summary) < len(text):
+                summary += " …"
+            stub = ChatMessage(
+                role=msg.role,
+                text=f"{_SUPERSEDED_PREFIX}{label}] {summary}".rstrip(),
+                author_name=msg.author_name,
+            )
+            list.__setitem__(self, position, stub)
+            self._chars += len(stub.text) - len(text)
+            METRICS.inc("headlineart_transcript_compacted_total", stage=key if msg.role == Role.ASSISTANT else "review")
+            compacted += 1
+        if compacted:
+            print(f"[Transcript] Summarized {compacted} superseded message(s) to fit {budget} tokens")
+        return compacted
+
+
+# ---------------------------------------------------------------------------
+# Shared model clients: one connection pool and one token cache per scope
+# ---------------------------------------------------------------------------
+class CachedTokenProvider:
+    """Async bearer-token provider shared by every client that uses the same scope.
+
+    Tokens are reused until shortly before they expire, and concurrent callers
+    wait on a single refresh instead of each hitting the credential.
+    """
+
+    def __init__(self, credential: "DefaultAzureCredential", scope: str, refresh_margin: float = 300):
+        self._credential = credential
+        self._scope = scope
+        self._refresh_margin = refresh_margin
+        self._token = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and self._token.expires_on - time.time() > self._refresh_margin
+
+    async def __call__(self) -> str:
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    self._token = await self._credential.get_token(self._scope)
+        return self._token.token
+
+
+@functools.cache
+def _pooled_azure_ai_client_class() -> type:
+    """Define PooledAzureAIClient on first use (agent_framework.azure is slow to import)."""
+    from agent_framework.azure import AzureAIClient
+
+    class PooledAzureAIClient(AzureAIClient):
+        """AzureAIClient that reuses a shared OpenAI client.
+
+        The stock client asks its project client for a brand-new AsyncOpenAI (with
+        its own connection pool) on every request; here all agents share one.
+        """
+
+        def __init__(self, *, openai_client: "AsyncOpenAI", **kwargs):
+            super().__init__(**kwargs)
+            self.client = openai_client
+
+        async def _initialize_client(self) -> None:
+            pass  # the shared client is injected in __init__
+
+    return PooledAzureAIClient
+
+
+# ---------------------------------------------------------------------------
+# Image prompt pre-moderation (local, before any remote call)
+# ---------------------------------------------------------------------------
+class PromptFilter:
+    """Blocklist of terms and patterns, rewritten or stripped from image prompts.
+
+    Literal terms are compiled into a single case-insensitive alternation
+    (longest first, so "Elon Musk" wins over "Musk") with a dict from the
+    lowercased term to its rule; `re:` rules are compiled separately. Terms
+    match whole words — a hyphen counts as part of the word, so "gun" leaves
+    "gun-metal" alone — plus plural and possessive endings ("guns",
+    "Nike's"). Allowed phrases ("shooting star") are matched too, but left
+    as they are. See specs/image_blocklist.txt for the format.
+    """
+
+    # Stands in for a stripped term until the surrounding punctuation is tidied
+    _STRIPPED = "\x00"
+
+    def __init__(self, rules: list[tuple[str, str, str]], allowed: list[str] = ()):
+        self._terms: dict[str, tuple[str, str] | None] = {phrase.lower(): None for phrase in allowed}
+        self._patterns: list[tuple[re.Pattern, str, str]] = []
+        for category, pattern, replacement in rules:
+            if pattern.startswith("re:"):
+                self._patterns.append((re.compile(pattern[3:]), category, replacement))
+            else:
+                self._terms[pattern.lower()] = (category, replacement)
+        alternation = "|".join(re.escape(term) for term in sorted(self._terms, key=len, reverse=True))
+        self._term_pattern = (
+            re.compile(rf"(?<![\w-])({alternation})('s|s|es)?(?![\w-])", re.IGNORECASE) if self._terms else None
+        )
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "PromptFilter":
+        rules = []
+        allowed = []
+        category = "default"
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                category = line[1:-1].strip()
+                continue
+            if category == "allow":
+                allowed.append(line)
+                continue
+            pattern, _, replacement = line.partition(" =>")
+            rules.append((category, pattern.strip(), replacement.strip()))
+        return cls(rules, allowed)
+
+    def sanitize(self, text: str) -> tuple[str, list[str]]:
+        """Return the rewritten text and the category of every match."""
+        hits: list[str] = []
+
+        def substitute(category: str, replacement: str) -> str:
+            hits.append(category)
+            return replacement or self._STRIPPED
+
+        def substitute_term(match: re.Match) -> str:
+            rule = self._terms[match.group(1).lower()]
+            if rule is None:
+                return match.group(0)  # an allowed phrase
+            category, replacement = rule
+            if replacement and match.group(2) in ("s", "es") and not replacement.endswith("s"):
+                replacement += "s"  # "battles" → "struggles"
+            return substitute(category, replacement)
+
+        for pattern, category, replacement in self._patterns:
+            text = pattern.sub(lambda _, c=category, r=replacement: substitute(c, r), text)
+        if self._term_pattern is not None:
+            text = self._term_pattern.sub(substitute_term, text)
+        if hits:
+            # Tidy what stripped spans leave behind ("guns, bombs, and smoke", "(gore)", "a , b")
+            stripped = self._STRIPPED
+            text = re.sub(rf"{stripped}(?:[ \t]*,)?[ \t]*(?:(?:and|or)[ \t]+)?(?={stripped})", "", text)
+            text = re.sub(rf"{stripped}(?:[ \t]*,)?[ \t]+(?:and|or)\b|,?[ \t]+(?:and|or)[ \t]+{stripped}", "", text)
+            text = re.sub(rf"{stripped}(?:[ \t]*[,;:])?", "", text)
+            text = re.sub(r"\(\s*\)|\[\s*\]|\"\s*\"|“\s*”", "", text)
+            text = re.sub(r"\s+([,.;:!?])", r"\1", text)
+            text = re.sub(r"([,;:])(?:\s*[,;:])+", r"\1", text)
+            text = re.sub(r"[,;:]+(?=[.!?])", "", text)
+            text = re.sub(r"[ \t]{2,}", " ", text).strip(" ,;:")
+        return text, hits
+
+
+def _truncate_prompt(text: str, max_chars: int) -> str:
+    """Cut `text` to at most `max_chars`, at a sentence end if there is one in the
+    second half of the budget, otherwise at a word boundary."""
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars + 1]
+    sentence_ends = [m.end() for m in re.finditer(r"[.!?](?=\s)", head) if m.end() <= max_chars]
+    if sentence_ends and sentence_ends[-1] >= max_chars // 2:
+        return head[:sentence_ends[-1]]
+    cut = head.rfind(" ")
+    return (head[:cut] if cut > 0 else text[:max_chars]).rstrip(" ,;:-")
+
+
+def _precheck_image_prompt(prompt: str) -> tuple[str, list[str]]:
+    """Apply IMAGE_PROMPT_FILTER and the length cap, recording precheck metrics."""
+    hits: list[str] = []
+    if IMAGE_PROMPT_FILTER is not None:
+        prompt, hits = IMAGE_PROMPT_FILTER.sanitize(prompt)
+    for category in hits:
+        METRICS.inc("headlineart_image_precheck_hits_total", category=category)
+    METRICS.inc("headlineart_image_precheck_total", result="rewritten" if hits else "clean")
+    return _truncate_prompt(prompt, IMAGE_PROMPT_MAX_CHARS), hits
+
+
+IMAGE_PROMPT_FILTER = PromptFilter.from_file(Path(__file__).parent / IMAGE_BLOCKLIST) if IMAGE_BLOCKLIST else None
+
+
+# ---------------------------------------------------------------------------
+# Image generation scheduling (shared rate limit across runs)
+# ---------------------------------------------------------------------------
+class ImageQueueFullError(RuntimeError):
+    """Raised when more image requests are waiting than HEADLINEART_IMAGE_QUEUE_SIZE allows."""
+
+
+def _classify_image_error(error: Exception) -> str:
+    """"moderation", "throttle", "transient" or "fatal" for an images.generate error."""
+    if isinstance(error, ImageQueueFullError):
+        return "throttle"
+    status = getattr(error, "status_code", None)
+    code = str(getattr(error, "code", "") or "")
+    text = f"{code} {error}".lower()
+    if status == 429:
+        return "throttle"
+    if status == 400 and any(marker in text for marker in ("content_policy", "moderation", "safety system")):
+        return "moderation"
+    if (status is not None and status >= 500) or status == 408:
+        return "transient"
+    if status is None and type(error).__name__ in ("APIConnectionError", "APITimeoutError", "TimeoutError"):
+        return "transient"
+    if status is None and "content_policy" in text:
+        return "moderation"
+    return "fatal"
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Seconds from the error's Retry-After header, if the service sent one."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class ImageScheduler:
+    """Gate for images.generate shared by all runs.
+
+    A token bucket refills `rate_per_minute` tokens per minute (up to
+    `burst`); each call takes one, waiting in FIFO order. At most
+    `max_queue` calls may wait. Throttling (429) and transient errors are
+    retried with jittered exponential backoff (or the Retry-After delay) and
+    a 429 also empties the bucket; moderation and other errors are raised
+    to the caller straight away.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float = 0,
+        burst: int = 1,
+        max_queue: int = 32,
+        max_retries: int = 4,
+        backoff_seconds: float = 2.0,
+        max_backoff_seconds: float = 60.0,
+    ):
+        self.rate = rate_per_minute / 60
+        self.burst = max(burst, 1)
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._lock = asyncio.Lock()  # FIFO: waiters get tokens in arrival order
+        self._waiting = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    async def _acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        if self._waiting >= self.max_queue:
+            raise ImageQueueFullError(f"{self._waiting} image requests already waiting")
+        self._waiting += 1
+        METRICS.set("headlineart_image_queue_depth", self._waiting)
+        started = time.perf_counter()
+        try:
+            async with self._lock:
+                self._refill()
+                while self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                self._tokens -= 1
+        finally:
+            self._waiting -= 1
+            METRICS.set("headlineart_image_queue_depth", self._waiting)
+            METRICS.observe("headlineart_image_queue_wait_seconds", time.perf_counter() - started)
+
+    async def generate(self, image_client: "AsyncAzureOpenAI", **kwargs):
+        """images.generate(**kwargs) under the shared rate limit, retrying throttling/transient errors."""
+        for retry in range(self.max_retries + 1):
+            await self._acquire()
+            try:
+                return await image_client.images.generate(**kwargs)
+            except Exception as e:
+                kind = _classify_image_error(e)
+                METRICS.inc("headlineart_image_errors_total", kind=kind)
+                if kind not in ("throttle", "transient") or retry == self.max_retries:
+                    raise
+                if kind == "throttle":
+                    self._tokens, self._refilled = 0.0, time.monotonic()
+                backoff = min(self.max_backoff_seconds, self.backoff_seconds * 2**retry)
+                delay = _retry_after(e) or random.uniform(backoff / 2, backoff)
+                METRICS.inc("headlineart_image_retries_total", kind=kind)
+                print(f"[ImageScheduler] {kind} error ({type(e).__name__}), retry {retry + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+IMAGE_SCHEDULER = ImageScheduler(
+    IMAGE_RATE_PER_MINUTE, IMAGE_BURST, IMAGE_QUEUE_SIZE, IMAGE_MAX_RETRIES, IMAGE_BACKOFF_SECONDS
+)
+
+
+# ---------------------------------------------------------------------------
+# Image persistence (runs in worker threads, never on the event loop)
+# ---------------------------------------------------------------------------
+_IMAGE_IO_POOL = ThreadPoolExecutor(max_workers=IMAGE_IO_WORKERS, thread_name_prefix="image-io")
+
+# Base64 is decoded in slices; a multiple of 4 characters decodes independently
+_B64_CHUNK_CHARS = 1 << 20
+
+
+def _new_image_path() -> Path:
+    """Collision-free output path: timestamp for sorting plus a random suffix."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return OUTPUT_DIR / f"quadro_{timestamp}_{uuid4().hex[:8]}.png"
+
+
+def _save_image(b64_data: str, image_path: Path) -> int:
+    """Decode a base64 image into `image_path` atomically and return its size in bytes.
+
+    The image is streamed into a temp file in the same directory, fsynced and
+    then renamed into place, so readers never see a partially written PNG.
+    """
+    image_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=image_path.parent, prefix=".quadro_", suffix=".tmp")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for start in range(0, len(b64_data), _B64_CHUNK_CHARS):
+                chunk = base64.b64decode(b64_data[start:start + _B64_CHUNK_CHARS])
+                f.write(chunk)
+                size += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_name, 0o644)  # mkstemp creates files readable by the owner only
+        os.replace(tmp_name, image_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return size
+
+
+async def _save_image_async(b64_data: str, image_path: Path) -> int:
+    """Run `_save_image` on the image I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IMAGE_IO_POOL, _save_image, b64_data, image_path)
+
+
+# ---------------------------------------------------------------------------
+# Derived image variants (encoded in a process pool)
+# ---------------------------------------------------------------------------
+# format name → (Pillow format, file extension)
+VARIANT_FORMATS = {"jpeg": ("JPEG", "jpg"), "webp": ("WEBP", "webp"), "png": ("PNG", "png")}
+
+
+def _parse_variant_specs(config: str) -> list[tuple[str, str, int, int]]:
+    """Parse HEADLINEART_IMAGE_VARIANTS into (name, format, max_side, quality) tuples."""
+    specs = []
+    for entry in filter(None, (part.strip() for part in config.split(","))):
+        name, _, spec = entry.partition("=")
+        fields = spec.split(":")
+        try:
+            if not name or fields[0] not in VARIANT_FORMATS or len(fields) not in (2, 3):
+                raise ValueError
+            max_side = int(fields[1])
+            quality = int(fields[2]) if len(fields) == 3 else 85
+            if max_side < 1 or not 1 <= quality <= 100:
+                raise ValueError
+        except ValueError:
+            raise ValueError(
+                f"Invalid image variant '{entry}' in HEADLINEART_IMAGE_VARIANTS: expected "
+                f"name=format:max_side[:quality] with format one of {', '.join(VARIANT_FORMATS)}, "
+                "a positive max_side and a quality of 1-100"
+            ) from None
+        specs.append((name, fields[0], max_side, quality))
+    return specs
+
+
+_VARIANT_SPECS = _parse_variant_specs(IMAGE_VARIANTS)
+_variant_pool: ProcessPoolExecutor | None = None
+
+
+def _render_variants(image_path: str, specs: list[tuple[str, str, int, int]], out_dir: str) -> list[tuple[str, str, int]]:
+    """Encode the configured variants of an image; returns (name, path, bytes) per variant.
+
+    Runs in a worker process, so it only takes and returns picklable values.
+    """
+    from PIL import Image
+
+    results = []
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    with Image.open(image_path) as source:
+        source.load()
+        for name, fmt, max_side, quality in specs:
+            pil_format, ext = VARIANT_FORMATS[fmt]
+            variant = source.copy()
+            variant.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            if pil_format == "JPEG" and variant.mode != "RGB":
+                variant = variant.convert("RGB")
+            out_path = Path(out_dir) / f"{Path(image_path).stem}_{name}.{ext}"
+            tmp_path = out_path.with_name(f".{out_path.name}.tmp")
+            variant.save(tmp_path, format=pil_format, quality=quality, optimize=True)
+            os.replace(tmp_path, out_path)
+            results.append((name, str(out_path), out_path.stat().st_size))
+    return results
+
+
+async def _render_variants_async(image_path: Path) -> list[tuple[str, str, int]]:
+    """Run `_render_variants` on the bounded variant process pool."""
+    global _variant_pool
+    if _variant_pool is None:
+        _variant_pool = ProcessPoolExecutor(max_workers=VARIANT_WORKERS)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _variant_pool, _render_variants, str(image_path), _VARIANT_SPECS, str(image_path.parent / "variants")
+    )
+
+
+# ---------------------------------------------------------------------------
+# Near-duplicate text detection (MinHash over character shingles)
+# ---------------------------------------------------------------------------
+_MINHASH_PRIME = (1 << 61) - 1
+# Fixed seed: signatures must stay comparable across runs and restarts
+_MINHASH_RNG = random.Random(20240601)
+_MINHASH_PERMUTATIONS = [
+    (_MINHASH_RNG.randrange(1, _MINHASH_PRIME), _MINHASH_RNG.randrange(_MINHASH_PRIME)) for _ in range(64)
+]
+
+
+def _normalize_text(text: str) -> str:
+    """Lowercase words only, single-spaced (case, punctuation and spacing ignored)."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def minhash_signature(text: str, shingle_size: int = 5, words: bool = False) -> tuple[int, ...]:
+    """MinHash signature of the normalized text's character (or word) shingles."""
+    normalized = _normalize_text(text)
+    tokens = normalized.split() if words else normalized
+    shingles = {
+        " ".join(tokens[i : i + shingle_size]) if words else tokens[i : i + shingle_size]
+        for i in range(max(len(tokens) - shingle_size + 1, 1))
+    }
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+    return tuple(min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in _MINHASH_PERMUTATIONS)
+
+
+def minhash_similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class MinHashLSH:
+    """Locality-sensitive index over MinHash signatures.
+
+    Signatures are split into `bands`; keys that share any band are
+    candidates. With 64 permutations in 32 bands of 2, pairs above ~0.3
+    similarity are almost always candidates, so `query` only has to verify
+    a handful of signatures instead of scanning every key.
+    """
+
+    def __init__(self, bands: int = 32):
+        self.bands = bands
+        self._rows = len(_MINHASH_PERMUTATIONS) // bands
+        self._buckets: defaultdict[tuple, set[str]] = defaultdict(set)
+        self._signatures: dict[str, tuple[int, ...]] = {}
+
+    def _band_keys(self, signature: tuple[int, ...]) -> list[tuple]:
+        rows = self._rows
+        return [(band, signature[band * rows : (band + 1) * rows]) for band in range(self.bands)]
+
+    def add(self, key: str, signature: tuple[int, ...]) -> None:
+        self.remove(key)
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets[band_key].add(key)
+
+    def remove(self, key: str) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets[band_key]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def query(self, signature: tuple[int, ...], threshold: float) -> list[tuple[float, str]]:
+        """(similarity, key) of indexed keys at or above `threshold`, most similar first."""
+        candidates = set().union(*(self._buckets.get(band_key, ()) for band_key in self._band_keys(signature)))
+        matches = [(minhash_similarity(signature, self._signatures[key]), key) for key in candidates]
+        return sorted((match for match in matches if match[0] >= threshold), reverse=True)
+
+
+# ---------------------------------------------------------------------------
+# Image reuse cache (near-duplicate prompts share one generated image)
+# ---------------------------------------------------------------------------
+class ImageReuseCache:
+    """Past (prompt → image) pairs, looked up by prompt similarity.
+
+    Each entry is a hard link (a copy on filesystems without links) to the
+    image in `directory`, so evicting it never removes a run's own output.
+    The index (prompt, signature, size, last use) is kept in
+    `directory/index.json` and capped by entry count and total bytes, least
+    recently used first. All methods block; call them on the image I/O pool.
+    """
+
+    def __init__(self, directory: str | Path, threshold: float, max_entries: int = 200, max_bytes: int = 500 << 20):
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, dict] = OrderedDict()  # least recently used first
+        self._lsh = MinHashLSH()
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _index_path(self) -> Path:
+        return self.directory / "index.json"
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            entries = json.loads(self._index_path().read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]["used"]):
+            if (self.directory / entry["file"]).exists():
+                entry["signature"] = tuple(entry["signature"])
+                self._entries[key] = entry
+                self._lsh.add(key, entry["signature"])
+
+    def _save(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_path().with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._entries), encoding="utf-8")
+        os.replace(tmp, self._index_path())
+
+    def lookup(self, prompt: str, target: Path) -> float | None:
+        """Materialize the stored image of the most similar prompt at `target`.
+
+        Returns the similarity, or None when no stored prompt reaches the
+        threshold.
+        """
+        signature = minhash_signature(prompt)
+        with self._lock:
+            self._load()
+            for similarity, key in self._lsh.query(signature, self.threshold):
+                entry = self._entries[key]
+                try:
+                    _link_or_copy(self.directory / entry["file"], target)
+                except OSError:
+                    self._evict(key)
+                    continue
+                entry["used"] = time.time()
+                self._entries.move_to_end(key)
+                self._save()
+                return similarity
+        return None
+
+    def store(self, prompt: str, image_path: Path) -> int:
+        """Add `image_path` as the image of `prompt`; returns the number of LRU evictions.
+
+        Runs on worker threads, so metrics are left to the caller (see Metrics).
+        """
+        key = hashlib.sha256(_normalize_text(prompt).encode()).hexdigest()[:32]
+        filename = f"{key}{image_path.suffix}"
+        with self._lock:
+            self._load()
+            self._evict(key)
+            _link_or_copy(image_path, self.directory / filename)
+            signature = minhash_signature(prompt)
+            self._entries[key] = {
+                "prompt": prompt,
+                "file": filename,
+                "size": image_path.stat().st_size,
+                "signature": signature,
+                "used": time.time(),
+            }
+            self._lsh.add(key, signature)
+            total = sum(entry["size"] for entry in self._entries.values())
+            evicted = 0
+            while len(self._entries) > self.max_entries or total > self.max_bytes:
+                oldest = next(iter(self._entries))
+                total -= self._entries[oldest]["size"]
+                self._evict(oldest)
+                evicted += 1
+            self._save()
+        return evicted
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        self._lsh.remove(key)
+        if entry:
+            (self.directory / entry["file"]).unlink(missing_ok=True)
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+async def _reuse_image_async(prompt: str, target: Path) -> float | None:
+    """Look `prompt` up in IMAGE_REUSE_CACHE on the image I/O pool (see ImageReuseCache.lookup)."""
+    if IMAGE_REUSE_CACHE is None:
+        return None
+    loop = asyncio.get_running_loop()
+    try:
+        similarity = await loop.run_in_executor(_IMAGE_IO_POOL, IMAGE_REUSE_CACHE.lookup, prompt, target)
+    except OSError as e:
+        print(f"[ImageReuseCache] Lookup failed: {type(e).__name__}: {e}")
+        similarity = None
+    METRICS.inc("headlineart_image_reuse_total", result="miss" if similarity is None else "hit")
+    return similarity
+
+
+async def _remember_image_async(prompt: str, image_path: Path) -> None:
+    """Add a freshly generated image to IMAGE_REUSE_CACHE on the image I/O pool."""
+    if IMAGE_REUSE_CACHE is None:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        evicted = await loop.run_in_executor(_IMAGE_IO_POOL, IMAGE_REUSE_CACHE.store, prompt, image_path)
+    except OSError as e:
+        print(f"[ImageReuseCache] Could not store image: {type(e).__name__}: {e}")
+        return
+    if evicted:
+        METRICS.inc("headlineart_image_reuse_total", evicted, result="evicted")
+
+
+IMAGE_REUSE_CACHE = (
+    ImageReuseCache(
+        IMAGE_REUSE_DIR or OUTPUT_DIR / "reuse",
+        IMAGE_REUSE_THRESHOLD,
+        IMAGE_REUSE_MAX_ENTRIES,
+        int(IMAGE_REUSE_MAX_MB * (1 << 20)),
+    )
+    if IMAGE_REUSE_THRESHOLD > 0
+    else None
+)
+
+
+# ---------------------------------------------------------------------------
+# Gallery manifest (append-only SQLite index of finished artworks)
+# ---------------------------------------------------------------------------
+# Columns returned by Gallery.query (the thumbnail is fetched separately)
+_GALLERY_COLUMNS = (
+    "id", "created", "date", "theme", "image_path", "image_sha256", "image_bytes", "variants",
+    "prompt", "prompt_kind", "reused", "caption", "hashtags", "scores", "review_cycles",
+    "stage_seconds", "prompt_tokens", "thumbnail_bytes",
+)
+_GALLERY_JSON_COLUMNS = ("variants", "hashtags", "scores", "stage_seconds", "prompt_tokens")
+
+
+class Gallery:
+    """Append-only SQLite manifest of finished artworks with paginated queries.
+
+    Records are only ever inserted (triggers reject UPDATE and DELETE), and
+    indexed by date and theme. Each carries a small WEBP thumbnail, so
+    listing and previewing past artwork never opens the full PNGs. Queries
+    page by id ("before" cursor), which stays fast however large the table
+    grows. The file defaults to OUTPUT_DIR/gallery.db, resolved on first use;
+    thumbnails are extracted on demand to a "thumbnails" folder next to it.
+    """
+
+    def __init__(self, db_path: str | Path | None = None):
+        self.db_path = Path(db_path) if db_path else None
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()  # the connection is used from worker threads
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.db_path = self.db_path or OUTPUT_DIR / "gallery.db"
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS artworks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL, date TEXT, theme TEXT,
+                    image_path TEXT, image_sha256 TEXT, image_bytes INTEGER, variants TEXT,
+                    prompt TEXT, prompt_kind TEXT, reused REAL, caption TEXT, hashtags TEXT, scores TEXT,
+                    review_cycles INTEGER, stage_seconds TEXT, prompt_tokens TEXT,
+                    thumbnail BLOB, thumbnail_bytes INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS artworks_date ON artworks (date);
+                CREATE INDEX IF NOT EXISTS artworks_theme ON artworks (theme COLLATE NOCASE);
+                CREATE TRIGGER IF NOT EXISTS artworks_no_update BEFORE UPDATE ON artworks
+                    BEGIN SELECT RAISE(ABORT, 'the gallery is append-only'); END;
+                CREATE TRIGGER IF NOT EXISTS artworks_no_delete BEFORE DELETE ON artworks
+                    BEGIN SELECT RAISE(ABORT, 'the gallery is append-only'); END;
+                """
+            )
+            self._db = db
+        return self._db
+
+    def _insert(self, record: dict) -> int:
+        image_path = Path(record["image_path"])
+        digest = hashlib.sha256()
+        with open(image_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        created = time.time()
+        row = {
+            **{column: record.get(column) for column in _GALLERY_COLUMNS},
+            **{column: json.dumps(record.get(column, {})) for column in _GALLERY_JSON_COLUMNS},
+            "id": None,
+            "created": created,
+            "date": datetime.fromtimestamp(created).date().isoformat(),
+            "image_path": str(image_path),
+            "image_sha256": digest.hexdigest(),
+            "image_bytes": image_path.stat().st_size,
+            "thumbnail_bytes": len(record["thumbnail"]) if record.get("thumbnail") else 0,
+        }
+        columns = [*_GALLERY_COLUMNS, "thumbnail"]
+        row["thumbnail"] = record.get("thumbnail")
+        with self._db_lock:
+            db = self._connect()
+            cursor = db.execute(
+                f"INSERT INTO artworks ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [row[column] for column in columns],
+            )
+            db.commit()
+            return cursor.lastrowid
+
+    def _select(
+        self, date: str | None, theme: str | None, search: str | None, before: int | None, limit: int
+    ) -> tuple[list[dict], int | None]:
+        clauses, params = [], []
+        if date:
+            clauses.append("date = ?")
+            params.append(date)
+        if theme:
+            clauses.append("theme = ? COLLATE NOCASE")
+            params.append(theme)
+        if search:
+            clauses.append("(theme LIKE ? OR caption LIKE ? OR prompt LIKE ?)")
+            params += [f"%{search}%"] * 3
+        if before:
+            clauses.append("id < ?")
+            params.append(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._db_lock:
+            rows = self._connect().execute(
+                f"SELECT {', '.join(_GALLERY_COLUMNS)} FROM artworks {where} ORDER BY id DESC LIMIT ?",
+                [*params, limit + 1],
+            ).fetchall()
+        items = [dict(zip(_GALLERY_COLUMNS, row)) for row in rows[:limit]]
+        for item in items:
+            for column in _GALLERY_JSON_COLUMNS:
+                item[column] = json.loads(item[column] or "{}")
+        return items, (items[-1]["id"] if len(rows) > limit else None)
+
+    def _select_thumbnail(self, artwork_id: int) -> bytes | None:
+        with self._db_lock:
+            row = self._connect().execute("SELECT thumbnail FROM artworks WHERE id = ?", (artwork_id,)).fetchone()
+        return row[0] if row else None
+
+    async def add(self, record: dict) -> int:
+        """Append a record (see ImageCreatorExecutor._record_gallery); returns its id."""
+        return await asyncio.to_thread(self._insert, record)
+
+    async def query(
+        self,
+        date: str | None = None,
+        theme: str | None = None,
+        search: str | None = None,
+        before: int | None = None,
+        limit: int = GALLERY_PAGE_SIZE,
+    ) -> tuple[list[dict], int | None]:
+        """One page of records, newest first, and the `before` cursor of the next page (None at the end).
+
+        `date` (YYYY-MM-DD) and `theme` (case-insensitive) match exactly and use
+        the indexes; `search` is a substring of the theme, caption or prompt.
+        """
+        return await asyncio.to_thread(self._select, date, theme, search, before, limit)
+
+    def _write_thumbnail(self, artwork_id: int) -> Path | None:
+        self._connect()
+        path = self.db_path.parent / "thumbnails" / f"{artwork_id}.webp"
+        if path.exists():  # records never change, so an extracted file stays valid
+            return path
+        thumbnail = self._select_thumbnail(artwork_id)
+        if not thumbnail:
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(".part")
+        partial.write_bytes(thumbnail)
+        partial.replace(path)
+        return path
+
+    async def thumbnail(self, artwork_id: int) -> bytes | None:
+        """The record's WEBP thumbnail, or None."""
+        return await asyncio.to_thread(self._select_thumbnail, artwork_id)
+
+    async def thumbnail_path(self, artwork_id: int) -> Path | None:
+        """Path of the record's thumbnail as a WEBP file (written on first request), or None."""
+        return await asyncio.to_thread(self._write_thumbnail, artwork_id)
+
+
+def _render_thumbnail(image_path: str, max_side: int) -> bytes | None:
+    """WEBP thumbnail of an image, or None without Pillow (runs in the variant process pool)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    import io
+
+    with Image.open(image_path) as source:
+        source.draft("RGB", (max_side, max_side))
+        source.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        source.save(buffer, format="WEBP", quality=75)
+    return buffer.getvalue()
+
+
+async def _render_thumbnail_async(image_path: Path) -> bytes | None:
+    """Run `_render_thumbnail` on the bounded variant process pool."""
+    global _variant_pool
+    if not GALLERY_THUMBNAIL_SIZE:
+        return None
+    if _variant_pool is None:
+        _variant_pool = ProcessPoolExecutor(max_workers=VARIANT_WORKERS)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_variant_pool, _render_thumbnail, str(image_path), GALLERY_THUMBNAIL_SIZE)
+
+
+def _extract_section(text: str, *names: str, max_chars: int = 2000) -> str:
+    """Value of a "Name: value" line, or the paragraph under a "Name" heading, markdown stripped."""
+    label = rf"^[\W\d]*(?:{'|'.join(names)})\b"
+    field = rf"{label}[^\n:]{{0,40}}?:[*_\s]*(\S.*)$"
+    heading = rf"{label}[^\w\n]*(?:\([^)\n]*\)[^\w\n]*)?$"  # "## Primary Caption (150-300 words)"
+    match = re.search(f"{field}|{heading}", text, re.IGNORECASE | re.MULTILINE)
+    if match is None:
+        return ""
+    value = match.group(1)
+    if value is None:
+        value = re.split(r"\n\s*\n|\n(?=\s*#)", text[match.end():].lstrip("\n"), maxsplit=1)[0]
+    return re.sub(r"[*_#>`]+", "", value).strip().strip('"“”')[:max_chars]
+
+
+# Background gallery inserts still running (kept referenced until they finish)
+_GALLERY_TASKS: set[asyncio.Task] = set()
+
+
+async def _append_gallery_record(gallery: Gallery, record: dict) -> None:
+    """Render the thumbnail and append `record`; errors are logged, never raised."""
+    try:
+        record["thumbnail"] = await _render_thumbnail_async(record["image_path"])
+        artwork_id = await gallery.add(record)
+        print(f"[Gallery] Recorded artwork #{artwork_id}")
+    except Exception as e:
+        # The gallery is an index of the output — never fail anything over it
+        print(f"[Gallery] Could not record artwork: {type(e).__name__}: {e}")
+
+
+# "/gallery [date=YYYY-MM-DD] [theme=...] [before=<id>] [search text]" as the request text
+_GALLERY_PATTERN = re.compile(r"^\s*/gallery\b(.*)$", re.DOTALL)
+
+
+async def gallery_listing(request: str) -> str:
+    """Text listing of one gallery page for a "/gallery" request."""
+    if GALLERY_MANIFEST is None:
+        return "[Gallery] The gallery is disabled — set HEADLINEART_GALLERY=true to record artworks."
+    filters: dict[str, str] = dict(re.findall(r"\b(date|theme|before)=(\"[^\"]*\"|\S+)", request))
+    filters = {key: value.strip('"') for key, value in filters.items()}
+    search = re.sub(r"\b(?:date|theme|before)=(?:\"[^\"]*\"|\S+)", "", request).strip() or None
+    before = int(filters["before"]) if filters.get("before", "").isdigit() else None
+    items, cursor = await GALLERY_MANIFEST.query(filters.get("date"), filters.get("theme"), search, before)
+    if not items:
+        return "[Gallery] No artworks found."
+    thumbnails = await asyncio.gather(
+        *(GALLERY_MANIFEST.thumbnail_path(item["id"]) for item in items if item["thumbnail_bytes"])
+    )
+    thumbnail_of = dict(zip((item["id"] for item in items if item["thumbnail_bytes"]), thumbnails))
+    lines = [f"[Gallery] {len(items)} artwork(s), newest first:"]
+    for item in items:
+        scores = " · ".join(f"{category} {score:g}" for category, score in item["scores"].items())
+        thumbnail = thumbnail_of.get(item["id"])
+        thumbnail = f"{thumbnail} ({item['thumbnail_bytes']} bytes)" if thumbnail else "none"
+        lines.append(
+            f"#{item['id']} {item['date']} — {item['theme'] or '(no theme)'}\n"
+            f"    {item['image_path']} ({item['image_bytes']} bytes)\n"
+            f"    thumbnail: {thumbnail}\n"
+            f"    {' '.join((item['caption'] or '').split())[:120]}\n"
+            f"    {scores}"
+        )
+    if cursor is not None:
+        rest = re.sub(r"\bbefore=\S+", "", request).strip()
+        lines.append(f"More: /gallery before={cursor} {rest}".rstrip())
+    return "\n".join(lines)
+
+
+GALLERY_MANIFEST = Gallery(GALLERY_DB or None) if GALLERY else None
+
+
+# ---------------------------------------------------------------------------
+# NewsScout result cache (shared across runs)
+# ---------------------------------------------------------------------------
+class ScoutCache:
+    """TTL cache for NewsScout output with optional stale-while-revalidate.
+
+    Entries live in memory and, if `directory` is set, in one JSON file per
+    key so they survive restarts. Lookups for a key that is being fetched or
+    refreshed share that single agent call.
+    """
+
+    def __init__(self, ttl: float, stale: float = 0.0, directory: str | Path | None = None):
+        self.ttl = ttl
+        self.stale = stale
+        self.directory = Path(directory) if directory else None
+        self._entries: dict[str, tuple[float, str]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"scout_{key}.json"
+
+    def _read_disk(self, key: str) -> tuple[float, str] | None:
+        try:
+            data = json.loads(self._path(key).read_text(encoding="utf-8"))
+            return data["created"], data["text"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, created: float, text: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(key).with_suffix(".tmp")
+        tmp.write_text(json.dumps({"created": created, "text": text}), encoding="utf-8")
+        os.replace(tmp, self._path(key))
+
+    async def _lookup(self, key: str) -> tuple[float, str] | None:
+        entry = self._entries.get(key)
+        if entry is None and self.directory:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry:
+                self._entries[key] = entry
+        return entry
+
+    async def _store(self, key: str, text: str) -> None:
+        created = time.time()
+        # Drop entries that are past their stale window (old days, old triggers)
+        horizon = created - self.ttl - self.stale
+        self._entries = {k: v for k, v in self._entries.items() if v[0] >= horizon}
+        self._entries[key] = (created, text)
+        if self.directory:
+            try:
+                await asyncio.to_thread(self._write_disk, key, created, text)
+            except OSError as e:
+                print(f"[ScoutCache] Could not persist entry: {type(e).__name__}: {e}")
+
+    def _fetch(self, key: str, fetch: Callable[[], Awaitable[str]]) -> asyncio.Task:
+        """Run `fetch` once per key, store a non-empty result, and share the task."""
+        task = self._inflight.get(key)
+        if task is None:
+
+            async def run() -> str:
+                try:
+                    text = await fetch()
+                    if text:
+                        await self._store(key, text)
+                    return text
+                except Exception as e:
+                    print(f"[ScoutCache] Fetch failed: {type(e).__name__}: {e}")
+                    raise
+                finally:
+                    self._inflight.pop(key, None)
+
+            task = self._inflight[key] = asyncio.create_task(run())
+            # Background refreshes have no awaiter; mark their errors as handled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[str]]) -> tuple[str, str]:
+        """Return (text, result) where result is "hit", "stale", "joined" or "miss".
+
+        On a stale hit the cached text is returned immediately and `fetch`
+        refreshes the entry in the background. "joined" means another run's
+        fetch for the same key was awaited instead of calling the agent again.
+        """
+        entry = await self._lookup(key)
+        if entry:
+            age = time.time() - entry[0]
+            if age <= self.ttl:
+                return entry[1], "hit"
+            if age <= self.ttl + self.stale:
+                if key not in self._inflight:
+                    METRICS.inc("headlineart_scout_cache_total", result="refresh")
+                    print(f"[ScoutCache] Serving stale result ({age:.0f}s old), refreshing in background")
+                self._fetch(key, fetch)
+                return entry[1], "stale"
+        result = "joined" if key in self._inflight else "miss"
+        # shield(): a cancelled run must not cancel a fetch other runs are waiting on
+        return await asyncio.shield(self._fetch(key, fetch)), result
+
+
+def _scout_cache_key(messages: list[ChatMessage]) -> str:
+    """Hash of today's date and the normalized trigger text (case, punctuation and spacing ignored)."""
+    trigger = " ".join(m.text or "" for m in messages if m.role == Role.USER)
+    intent = " ".join(re.sub(r"[^\w\s]", " ", trigger.lower()).split())
+    return hashlib.sha256(f"{datetime.now().date().isoformat()}\n{intent}".encode()).hexdigest()[:32]
+
+
+SCOUT_CACHE = ScoutCache(SCOUT_CACHE_TTL, SCOUT_CACHE_STALE, SCOUT_CACHE_DIR) if SCOUT_CACHE_TTL > 0 else None
+
+
+# ---------------------------------------------------------------------------
+# Stage memoization (content-addressed, shared across runs)
+# ---------------------------------------------------------------------------
+# Stages whose output is reused for an identical (spec, model, input) triple
+MEMOIZED_STAGES = ("NewsAnalyst", "CreativeDirector", "ArtGenerator", "Copywriter")
+
+
+@functools.cache
+def _spec_digest(stage: str) -> str:
+    """SHA-256 of the stage's spec file, read once like its instructions (see _load_spec)."""
+    return hashlib.sha256((SPECS_DIR / AGENT_SPECS[stage]).read_bytes()).hexdigest()
+
+
+def _stage_cache_key(stage: str, prompt: list[ChatMessage]) -> str:
+    """Content address of one agent call: stage, spec contents, model and the exact input."""
+    payload = json.dumps(
+        [
+            stage,
+            _spec_digest(stage),
+            MODEL,
+            [[str(m.role.value), m.author_name or "", m.text or ""] for m in prompt],
+        ]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StageCache:
+    """Two-tier memo of stage outputs: an LRU dict plus an optional SQLite file.
+
+    The SQLite tier is capped at `max_bytes` of output text and evicts the
+    least recently used entries first. When it is opened, entries written
+    under an older version of a stage's spec file are dropped, so editing a
+    spec only invalidates that stage.
+    """
+
+    def __init__(self, memory_entries: int = 256, db_path: str | Path | None = None, max_bytes: int = 100 << 20):
+        self.memory_entries = memory_entries
+        self.db_path = Path(db_path) if db_path else None
+        self.max_bytes = max_bytes
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()  # the connection is used from worker threads
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS stage_outputs ("
+                "key TEXT PRIMARY KEY, stage TEXT, spec TEXT, text TEXT, size INTEGER, accessed REAL)"
+            )
+            for stage in MEMOIZED_STAGES:
+                db.execute("DELETE FROM stage_outputs WHERE stage = ? AND spec != ?", (stage, _spec_digest(stage)))
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key: str) -> str | None:
+        with self._db_lock:
+            db = self._connect()
+            row = db.execute("SELECT text FROM stage_outputs WHERE key = ?", (key,)).fetchone()
+            if row:
+                db.execute("UPDATE stage_outputs SET accessed = ? WHERE key = ?", (time.time(), key))
+                db.commit()
+            return row[0] if row else None
+
+    def _disk_put(self, key: str, stage: str, text: str) -> None:
+        size = len(text.encode())
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO stage_outputs VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stage, _spec_digest(stage), text, size, time.time()),
+            )
+            # Size-based eviction, least recently used first
+            total = 0
+            evict = []
+            for old_key, old_size in db.execute("SELECT key, size FROM stage_outputs ORDER BY accessed DESC"):
+                total += old_size
+                if total > self.max_bytes:
+                    evict.append((old_key,))
+            db.executemany("DELETE FROM stage_outputs WHERE key = ?", evict)
+            db.commit()
+
+    def _remember(self, key: str, text: str) -> None:
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> tuple[str | None, str]:
+        """Return (text or None, tier) where tier is "memory", "disk" or "miss"."""
+        text = self._memory.get(key)
+        if text is not None:
+            self._memory.move_to_end(key)
+            return text, "memory"
+        if self.db_path:
+            try:
+                text = await asyncio.to_thread(self._disk_get, key)
+            except sqlite3.Error as e:
+                print(f"[StageCache] Disk lookup failed: {type(e).__name__}: {e}")
+            if text is not None:
+                self._remember(key, text)
+                return text, "disk"
+        return None, "miss"
+
+    async def put(self, key: str, stage: str, text: str) -> None:
+        self._remember(key, text)
+        if self.db_path:
+            try:
+                await asyncio.to_thread(self._disk_put, key, stage, text)
+            except sqlite3.Error as e:
+                print(f"[StageCache] Could not persist entry: {type(e).__name__}: {e}")
+
+
+STAGE_OUTPUT_CACHE = (
+    StageCache(STAGE_CACHE_MEMORY_ENTRIES, STAGE_CACHE_DB or None, int(STAGE_CACHE_MAX_MB * (1 << 20)))
+    if STAGE_CACHE
+    else None
+)
+
+
+# ---------------------------------------------------------------------------
+# Checkpoints and resume
+# ---------------------------------------------------------------------------
+# "/resume <run id> [<checkpoint id>]" as the request text resumes a run
+_RESUME_PATTERN = re.compile(r"^\s*/resume\s+(\S+)(?:\s+(\S+))?\s*$")
+
+
+class SQLiteCheckpointStorage:
+    """CheckpointStorage that keeps every checkpoint as a JSON row in one SQLite file."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "checkpoint_id TEXT PRIMARY KEY, workflow_id TEXT, timestamp TEXT, data TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS checkpoints_workflow ON checkpoints (workflow_id)")
+        self._db.commit()
+        self._lock = threading.Lock()  # the connection is used from worker threads
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+            self._db.commit()
+            return rows
+
+    def _delete(self, checkpoint_id: str) -> bool:
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM checkpoints WHERE checkpoint_id = ?", (checkpoint_id,)).rowcount
+            self._db.commit()
+            return deleted > 0
+
+    async def save_checkpoint(self, checkpoint: WorkflowCheckpoint) -> str:
+        row = (checkpoint.checkpoint_id, checkpoint.workflow_id, checkpoint.timestamp, json.dumps(checkpoint.to_dict()))
+        await asyncio.to_thread(self._query, "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)", row)
+        return checkpoint.checkpoint_id
+
+    async def load_checkpoint(self, checkpoint_id: str) -> WorkflowCheckpoint | None:
+        rows = await asyncio.to_thread(
+            self._query, "SELECT data FROM checkpoints WHERE checkpoint_id = ?", (checkpoint_id,)
+        )
+        return WorkflowCheckpoint.from_dict(json.loads(rows[0][0])) if rows else None
+
+    async def list_checkpoint_ids(self, workflow_id: str | None = None) -> list[str]:
+        return [checkpoint.checkpoint_id for checkpoint in await self.list_checkpoints(workflow_id)]
+
+    async def list_checkpoints(self, workflow_id: str | None = None) -> list[WorkflowCheckpoint]:
+        if workflow_id is None:
+            rows = await asyncio.to_thread(self._query, "SELECT data FROM checkpoints ORDER BY timestamp")
+        else:
+            rows = await asyncio.to_thread(
+                self._query, "SELECT data FROM checkpoints WHERE workflow_id = ? ORDER BY timestamp", (workflow_id,)
+            )
+        return [WorkflowCheckpoint.from_dict(json.loads(data)) for (data,) in rows]
+
+    async def delete_checkpoint(self, checkpoint_id: str) -> bool:
+        return await asyncio.to_thread(self._delete, checkpoint_id)
+
+
+def create_checkpoint_storage() -> CheckpointStorage | None:
+    """Checkpoint storage configured by HEADLINEART_CHECKPOINT_DIR / _DB, or None."""
+    if CHECKPOINT_DIR and CHECKPOINT_DB:
+        raise ValueError("Set only one of HEADLINEART_CHECKPOINT_DIR and HEADLINEART_CHECKPOINT_DB")
+    if CHECKPOINT_DB:
+        return SQLiteCheckpointStorage(CHECKPOINT_DB)
+    if CHECKPOINT_DIR:
+        return FileCheckpointStorage(CHECKPOINT_DIR)
+    return None
+
+
+async def find_resume_checkpoint(storage: CheckpointStorage, run_id: str) -> str | None:
+    """Latest checkpoint of the run that still has messages to deliver.
+
+    Its senders are the last completed stages; resuming from it re-runs only
+    what follows (for a finished run: the Image Creator, fed with the
+    [FINAL_APPROVED] transcript).
+    """
+    checkpoints = await storage.list_checkpoints(run_id)
+    pending = [checkpoint for checkpoint in checkpoints if any(checkpoint.messages.values())]
+    return max(pending, key=lambda checkpoint: checkpoint.timestamp).checkpoint_id if pending else None
+
+
+async def resume_run(
+    create_workflow: Callable[..., Workflow],
+    storage: CheckpointStorage,
+    run_id: str,
+    checkpoint_id: str | None = None,
+):
+    """Resume a run from `checkpoint_id` or its last completed stage; returns the WorkflowRunResult."""
+    checkpoint_id = checkpoint_id or await find_resume_checkpoint(storage, run_id)
+    if checkpoint_id is None:
+        raise ValueError(f"No resumable checkpoint for run {run_id}")
+    return await create_workflow().run(checkpoint_id=checkpoint_id, checkpoint_storage=storage)
+
+
+def _request_text(messages) -> str:
+    """Text of the last message of an agent request (str, ChatMessage or a list of them)."""
+    if isinstance(messages, list):
+        messages = messages[-1] if messages else None
+    if isinstance(messages, ChatMessage):
+        return messages.text or ""
+    return messages if isinstance(messages, str) else ""
+
+
+# ---------------------------------------------------------------------------
+# Review verdict parsing and revision routing
+# ---------------------------------------------------------------------------
+# The 5 scoring categories from specs/06_quality_reviewer.md and the stage that
+# owns each one. Sensitivity concerns can touch anything, so they restart at the top.
+REVIEW_CATEGORIES: dict[str, str] = {
+    "Art Concept": "CreativeDirector",
+    "Prompt Quality": "ArtGenerator",
+    "Copy Quality": "Copywriter",
+    "Sensitivity": "CreativeDirector",
+    "Engagement Potential": "Copywriter",
+}
+MIN_CATEGORY_SCORE = 5
+
+_RERUN_PATTERN = re.compile(r"Rerun: ([\w, ]+)")
+
+
+def _parse_category_scores(review_text: str) -> dict[str, float]:
+    """Extract the per-category scores (1-10) from the reviewer's verdict."""
+    scores: dict[str, float] = {}
+    for category in REVIEW_CATEGORIES:
+        # The first "N/10" on the category's line: "Art Concept: 8/10", "**Art Concept** — 8 / 10",
+        # "| Art Concept | 8/10 |" — other numbers ("2 typos", the "(1-10)" scale label) are not scores
+        match = re.search(
+            rf"{re.escape(category)}[^\n]*?(?<![\d.])(\d+(?:\.\d+)?)\s*/\s*10\b",
+            review_text,
+            re.IGNORECASE,
+        )
+        if match and 0 <= float(match.group(1)) <= 10:
+            scores[category] = float(match.group(1))
+    return scores
+
+
+# Leading markdown/punctuation and an optional "Verdict:" label before the verdict word
+_VERDICT_PATTERN = re.compile(r"^[\s*_#>`'\"]*(?:verdict\s*[:—–-]\s*[*_]*)?([A-Za-z_]+)", re.IGNORECASE)
+
+
+def _is_approved(review_text: str) -> bool:
+    """True if the reviewer's verdict — the first word of its reply — is APPROVED."""
+    match = _VERDICT_PATTERN.match(review_text)
+    return match is not None and match.group(1).upper() == "APPROVED"
+
+
+def _revision_stages(scores: dict[str, float]) -> tuple[str, ...]:
+    """Pick the stages to rerun from the stages owning a failing category.
+
+    Stages downstream of a rerun stage that consume its artifact are rerun too
+    (in the sequential topology that is everything after it); all other stages
+    keep their previous output. If no category is failing (overall score too
+    low) or the scores could not be parsed, the whole creative chain is rerun.
+    """
+    failing = {REVIEW_CATEGORIES[c] for c, score in scores.items() if score < MIN_CATEGORY_SCORE}
+    if not INCREMENTAL_REVIEW or not failing or "CreativeDirector" in failing:
+        return REVISABLE_STAGES
+    if TOPOLOGY == "parallel":
+        return tuple(stage for stage in BRANCH_STAGES if stage in failing)
+    start = next(stage for stage in REVISABLE_STAGES if stage in failing)
+    return REVISABLE_STAGES[REVISABLE_STAGES.index(start):]
+
+
+def _revision_entries(rerun: tuple[str, ...]) -> tuple[str, ...]:
+    """Stages the reviewer sends the revision to directly (the rest follow via edges)."""
+    if TOPOLOGY == "parallel" and "CreativeDirector" not in rerun:
+        return rerun
+    return rerun[:1]
+
+
+def _routes_to(stage: str):
+    """Edge condition: deliver the reviewer's output only to the stage(s) it targets."""
+
+    def condition(messages: list[ChatMessage]) -> bool:
+        text = messages[-1].text if messages else ""
+        if text.startswith(FINAL_APPROVED_MARKER):
+            return stage == "ImageCreator"
+        match = _RERUN_PATTERN.search(text.split("\n", 1)[0])
+        if match is None:
+            return False
+        rerun = tuple(name.strip() for name in match.group(1).split(","))
+        return stage in _revision_entries(rerun)
+
+    return condition
+
+
+def _merge_branches(branches: list[list[ChatMessage]]) -> Transcript:
+    """Merge parallel branch transcripts: shared prefix, then each branch's additions."""
+
+    def key(msg: ChatMessage):
+        return (msg.role, msg.author_name, msg.text)
+
+    base = branches[0]
+    prefix = 0
+    while all(prefix < len(b) and key(b[prefix]) == key(base[prefix]) for b in branches):
+        prefix += 1
+    merged = Transcript(base[:prefix])
+    for branch in branches:
+        merged.extend(branch[prefix:])
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Base executor: prompt assembly, agent call, progress events
+# ---------------------------------------------------------------------------
+class PipelineExecutor(Executor):
+    """Shared plumbing for the spec-driven agent executors."""
 
     agent: ChatAgent
+    stage: str = ""
 
-    def __init__(self, agent: ChatAgent, id: str = "NewsScout"):
+    def __init__(self, agent: ChatAgent, id: str | None = None):
         self.agent = agent
-        super().__init__(id=id)
+        super().__init__(id=id or self.stage)
 
-    @handler
-    async def handle_trigger(
-        self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]
-    ) -> None:
-        response = await self.agent.run(messages)
-        messages.extend(response.messages)
-        # Emit update event for HTTP streaming
+    async def _emit(self, ctx: WorkflowContext, text: str) -> None:
+        """Emit a progress update event for HTTP streaming."""
+        await ctx.add_event(
+            AgentRunUpdateEvent(
+                self.id,
+                data=AgentRunResponseUpdate(
+                    contents=[TextContent(text=text)],
+                    role=Role.ASSISTANT,
+                    response_id=str(uuid4()),
+                ),
+            )
+        )
+
+    def _streams_tokens(self, ctx: WorkflowContext) -> bool:
+        """True if agent output is forwarded as it is generated (see STREAM_TOKENS)."""
+        return STREAM_TOKENS and ctx.is_streaming()
+
+    async def _publish(self, ctx: WorkflowContext, response: AgentRunResponse) -> None:
+        """Emit a preview of each assistant message in the response."""
+        if self._streams_tokens(ctx):
+            return  # the full text has already been streamed
         for msg in response.messages:
             if msg.role == Role.ASSISTANT:
+                await self._emit(ctx, f"[{self.stage}] {msg.text[:200]}...")
+
+    async def _build_prompt(
+        self, messages: list[ChatMessage], ctx: WorkflowContext, instruction: ChatMessage | None = None
+    ) -> list[ChatMessage]:
+        """Assemble the agent input for the configured PIPELINE_MODE."""
+        if PIPELINE_MODE == "artifacts":
+            artifacts = await _get_run_state(ctx, ARTIFACTS_KEY, {})
+            prompt = _artifact_prompt(self.stage, messages, artifacts)
+        else:
+            prompt = list(messages)
+        if instruction is not None:
+            prompt.append(instruction)
+        return prompt
+
+    async def _stream_agent(self, prompt: list[ChatMessage], ctx: WorkflowContext) -> AgentRunResponse:
+        """Run the agent in streaming mode, forwarding text chunks as they arrive."""
+        await self._emit(ctx, f"\n\n[{self.stage}] ")
+        updates: list[AgentRunResponseUpdate] = []
+        async for update in self.agent.run_stream(prompt):
+            updates.append(update)
+            # Forward text only — tool calls and usage chunks stay internal
+            text_contents = [c for c in update.contents if isinstance(c, TextContent)]
+            if text_contents:
                 await ctx.add_event(
                     AgentRunUpdateEvent(
                         self.id,
                         data=AgentRunResponseUpdate(
-                            contents=[TextContent(text=f"[NewsScout] {msg.contents[-1].text[:200]}...")],
+                            contents=text_contents,
                             role=Role.ASSISTANT,
-                            response_id=str(uuid4()),
+                            author_name=self.stage,
+                            response_id=update.response_id,
+                            message_id=update.message_id,
                         ),
                     )
                 )
+        return AgentRunResponse.from_agent_run_response_updates(updates)
+
+    async def _run_agent(
+        self, messages: list[ChatMessage], ctx: WorkflowContext, instruction: ChatMessage | None = None
+    ) -> AgentRunResponse:
+        """Run the agent, record its prompt size and store its output as this stage's artifact."""
+        prompt = await self._build_prompt(messages, ctx, instruction)
+        memoized = STAGE_OUTPUT_CACHE is not None and self.stage in MEMOIZED_STAGES
+        if memoized:
+            cache_key = _stage_cache_key(self.stage, prompt)
+            text, tier = await STAGE_OUTPUT_CACHE.get(cache_key)
+            METRICS.inc("headlineart_stage_cache_total", stage=self.stage, result=tier)
+            if text is not None:
+                print(f"[StageCache] {self.stage}: reused output ({tier})")
+                await self._log_prompt_tokens(ctx, 0)
+                return await self._replay(ctx, text)
+
+        with METRICS.span("headlineart_agent_seconds", agent=self.stage):
+            if self._streams_tokens(ctx):
+                response = await self._stream_agent(prompt, ctx)
+            else:
+                response = await self.agent.run(prompt)
+
+        prompt_tokens = self._record_usage(prompt, response)
+        await self._log_prompt_tokens(ctx, prompt_tokens)
+        await self._store_artifact(ctx, response.text)
+        if memoized and response.text:
+            await STAGE_OUTPUT_CACHE.put(cache_key, self.stage, response.text)
+        return response
+
+    async def _replay(self, ctx: WorkflowContext, text: str) -> AgentRunResponse:
+        """Turn previously generated output into this stage's response (and artifact)."""
+        await self._store_artifact(ctx, text)
+        if self._streams_tokens(ctx):
+            await self._emit(ctx, f"\n\n[{self.stage}] {text}")
+        return AgentRunResponse(messages=[ChatMessage(role=Role.ASSISTANT, text=text, author_name=self.stage)])
+
+    def _record_usage(self, prompt: list[ChatMessage], response: AgentRunResponse) -> int:
+        """Add the call's tokens to the metrics; return its prompt tokens."""
+        usage = response.usage_details
+        prompt_tokens = (usage.input_token_count if usage else None) or _estimate_tokens(prompt)
+        output_tokens = (usage.output_token_count if usage else None) or _estimate_tokens(response.messages)
+        _record_agent_usage(self.stage, prompt_tokens, output_tokens)
+        return prompt_tokens
+
+    async def _log_prompt_tokens(self, ctx: WorkflowContext, prompt_tokens: int) -> None:
+        print(f"[Tokens] {self.stage}: {prompt_tokens} prompt tokens ({PIPELINE_MODE} mode)")
+        await _update_run_state(
+            ctx, PROMPT_TOKENS_KEY, {}, lambda log: log.setdefault(self.stage, []).append(prompt_tokens)
+        )
+
+    async def _store_artifact(self, ctx: WorkflowContext, text: str) -> None:
+        if text:
+            await _update_run_state(ctx, ARTIFACTS_KEY, {}, lambda artifacts: artifacts.update({self.stage: text}))
+
+
+# ---------------------------------------------------------------------------
+# Start: forwards the request to the News Scout
+# ---------------------------------------------------------------------------
+class TriggerExecutor(Executor):
+    """Pass-through start executor.
+
+    The workflow only flushes the start executor's events once it has
+    finished, so an agent stage there could not stream. Starting here puts
+    the News Scout inside a superstep, where its chunks reach clients live.
+    """
+
+    def __init__(self, id: str = "Trigger"):
+        super().__init__(id=id)
+
+    @handler
+    async def forward(self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]) -> None:
         await ctx.send_message(messages)
 
 
 # ---------------------------------------------------------------------------
-# Executor 2: News Analyst
+# Executor 1: News Scout
 # ---------------------------------------------------------------------------
-class NewsAnalystExecutor(Executor):
-    """Curates, ranks, and identifies themes from collected news."""
+class NewsScoutExecutor(PipelineExecutor):
+    """Scans news sources and collects top daily stories."""
 
-    agent: ChatAgent
+    stage = "NewsScout"
 
-    def __init__(self, agent: ChatAgent, id: str = "NewsAnalyst"):
-        self.agent = agent
+    async def _run_cached(self, messages: list[ChatMessage], ctx: WorkflowContext) -> AgentRunResponse:
+        """Serve the scout's output from SCOUT_CACHE, running the agent only on a miss or refresh."""
+        prompt = await self._build_prompt(messages, ctx)
+
+        async def fetch() -> str:
+            # May outlive this run (background refresh), so it must not touch ctx
+            with METRICS.span("headlineart_agent_seconds", agent=self.stage):
+                response = await self.agent.run(prompt)
+            self._record_usage(prompt, response)
+            return response.text
+
+        text, result = await SCOUT_CACHE.get(_scout_cache_key(messages), fetch)
+        METRICS.inc("headlineart_scout_cache_total", result=result)
+        print(f"[ScoutCache] {result}")
+        await self._log_prompt_tokens(ctx, _estimate_tokens(prompt) if result == "miss" else 0)
+        return await self._replay(ctx, text)
+
+    @handler
+    @_instrumented
+    async def handle_trigger(
+        self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]
+    ) -> None:
+        messages = Transcript(messages)  # the caller's list stays untouched
+        if SCOUT_CACHE is not None:
+            response = await self._run_cached(messages, ctx)
+        else:
+            response = await self._run_agent(messages, ctx)
+        messages.extend(response.messages)
+        # Emit update event for HTTP streaming
+        await self._publish(ctx, response)
+        await ctx.send_message(messages)
+
+
+# ---------------------------------------------------------------------------
+# Story dedup: deterministic, between News Scout and News Analyst
+# ---------------------------------------------------------------------------
+# Line patterns that start a story, tried in order until one finds at least
+# two stories: numbered items ("1. **Headline**", "### Story 2:"), markdown
+# headings, then "Headline:" fields
+_STORY_START_PATTERNS = (
+    re.compile(r"^\s*(?:#{1,6}\s*)?(?:\*\*)?(?:Story\s*)?\d{1,2}\s*[.):—-]", re.IGNORECASE),
+    re.compile(r"^\s*#{2,6}\s+\S"),
+    re.compile(r"^\s*(?:[-*]\s*)?(?:\*\*)?Headline(?:\*\*)?\s*:", re.IGNORECASE),
+)
+_STORY_FIELD_PATTERN = re.compile(
+    r"^\s*(?:[-*]\s*)?(?:\*\*)?(?P<name>headline|title|sources?|(?:brief )?summary)(?:\*\*)?\s*:\s*(?:\*\*)?\s*"
+    r"(?P<value>.*?)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_URL_PATTERN = re.compile(r"https?://[^\s)\]>]+")
+
+
+@dataclass
+class Story:
+    """One story block of the News Scout output."""
+
+    headline: str
+    summary: str
+    sources: list[str]
+    text: str
+
+
+def _parse_story(block: str) -> Story:
+    fields: dict[str, str] = {}
+    for match in _STORY_FIELD_PATTERN.finditer(block):
+        fields.setdefault(match.group("name").lower().split()[-1].rstrip("s"), match.group("value"))
+    first_line = block.strip().splitlines()[0]
+    bold = re.search(r"\*\*(.+?)\*\*", first_line)
+    headline = (
+        fields.get("headline")
+        or fields.get("title")
+        or (bold.group(1) if bold else re.sub(r"^[\s#*\d.):—-]+|\*+", "", first_line))
+    )
+    sources = [fields["source"]] if fields.get("source") else []
+    sources += [url for url in _URL_PATTERN.findall(block) if not any(url in source for source in sources)]
+    # Without a summary field, compare the rest of the block minus its sources
+    body = [line for line in block.strip().splitlines()[1:] if not re.match(r"\W*sources?\W*:", line, re.IGNORECASE)]
+    summary = fields.get("summary") or _URL_PATTERN.sub("", "\n".join(body))
+    return Story(headline.strip(), summary, list(dict.fromkeys(sources)), block)
+
+
+def parse_stories(text: str) -> tuple[str, list[Story]]:
+    """Split scout output into (preamble, stories); no stories if it has no recognisable list."""
+    lines = text.splitlines(keepends=True)
+    for pattern in _STORY_START_PATTERNS:
+        starts = [i for i, line in enumerate(lines) if pattern.match(line)]
+        if len(starts) >= 2:
+            blocks = ["".join(lines[a:b]) for a, b in zip(starts, [*starts[1:], len(lines)])]
+            return "".join(lines[: starts[0]]), [_parse_story(block) for block in blocks]
+    return text, []
+
+
+def dedup_stories(text: str, threshold: float) -> tuple[str, int, int]:
+    """Collapse near-duplicate stories; return (text, stories kept, stories found).
+
+    Stories are compared by the MinHash similarity of the words in headline +
+    summary (outlets reword and reorder the same facts, which character
+    shingles punish) and clustered greedily in scout order, so the first story of each cluster is
+    kept and lists the other stories' sources. The result only depends on
+    the input text.
+    """
+    preamble, stories = parse_stories(text)
+    if len(stories) < 2:
+        return text, len(stories), len(stories)
+
+    index = MinHashLSH()
+    clusters: dict[int, list[int]] = {}
+    cluster_of: dict[str, int] = {}
+    for i, story in enumerate(stories):
+        signature = minhash_signature(f"{story.headline} {story.summary}", shingle_size=1, words=True)
+        matches = index.query(signature, threshold)
+        representative = cluster_of[matches[0][1]] if matches else i
+        cluster_of[str(i)] = representative
+        clusters.setdefault(representative, []).append(i)
+        index.add(str(i), signature)
+    if len(clusters) == len(stories):
+        return text, len(stories), len(stories)
+
+    blocks = []
+    for representative, members in clusters.items():
+        story = stories[representative]
+        merged = [
+            source
+            for member in members[1:]
+            for source in stories[member].sources
+            if source not in story.sources
+        ]
+        block = story.text.rstrip()
+        if merged:
+            block += f"\n- **Also reported by**: {'; '.join(dict.fromkeys(merged))}"
+        blocks.append(block + "\n\n")
+    return preamble + "".join(blocks).rstrip() + "\n", len(clusters), len(stories)
+
+
+class StoryDedupExecutor(Executor):
+    """Forwards the News Scout output with near-duplicate stories merged (no LLM call)."""
+
+    def __init__(self, threshold: float = STORY_DEDUP_THRESHOLD, id: str = "StoryDedup"):
+        self.threshold = threshold
         super().__init__(id=id)
 
     @handler
+    @_instrumented
+    async def handle_stories(
+        self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]
+    ) -> None:
+        messages = Transcript.of(messages)
+        last = max((i for i, m in enumerate(messages) if m.role == Role.ASSISTANT and m.text), default=None)
+        if last is not None:
+            text, kept, found = dedup_stories(messages[last].text, self.threshold)
+            METRICS.inc("headlineart_story_dedup_total", kept, result="kept")
+            METRICS.inc("headlineart_story_dedup_total", found - kept, result="merged")
+            print(f"[StoryDedup] {found} stories → {kept}")
+            if kept < found:
+                scout_output = ChatMessage(role=Role.ASSISTANT, text=text, author_name=messages[last].author_name)
+                messages = messages.replaced(last, scout_output)
+                # "artifacts" mode hands the analyst the NewsScout artifact, not the transcript
+                await _update_run_state(ctx, ARTIFACTS_KEY, {}, lambda artifacts: artifacts.update({"NewsScout": text}))
+        await ctx.send_message(messages)
+
+
+# ---------------------------------------------------------------------------
+# Executor 2: News Analyst
+# ---------------------------------------------------------------------------
+class NewsAnalystExecutor(PipelineExecutor):
+    """Curates, ranks, and identifies themes from collected news."""
+
+    stage = "NewsAnalyst"
+
+    @handler
+    @_instrumented
     async def handle_stories(
         self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]
     ) -> None:
-        response = await self.agent.run(messages)
+        messages = Transcript.of(messages)
+        response = await self._run_agent(messages, ctx)
         messages.extend(response.messages)
-        for msg in response.messages:
-            if msg.role == Role.ASSISTANT:
-                await ctx.add_event(
-                    AgentRunUpdateEvent(
-                        self.id,
-                        data=AgentRunResponseUpdate(
-                            contents=[TextContent(text=f"[NewsAnalyst] {msg.contents[-1].text[:200]}...")],
-                            role=Role.ASSISTANT,
-                            response_id=str(uuid4()),
-                        ),
-                    )
-                )
+        await self._publish(ctx, response)
         await ctx.send_message(messages)
 
 
 # ---------------------------------------------------------------------------
 # Executor 3: Creative Director
 # ---------------------------------------------------------------------------
-class CreativeDirectorExecutor(Executor):
+class CreativeDirectorExecutor(PipelineExecutor):
     """Translates curated news into an art concept brief."""
 
-    agent: ChatAgent
-    review_count: int = 0
-
-    def __init__(self, agent: ChatAgent, id: str = "CreativeDirector"):
-        self.agent = agent
-        super().__init__(id=id)
+    stage = "CreativeDirector"
 
     @handler
+    @_instrumented
     async def handle_analysis(
         self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]
     ) -> None:
+        messages = Transcript.of(messages)
         # Skip if this is a final approval routed from QualityReviewer
-        for msg in reversed(messages):
-            if msg.role == Role.USER and msg.contents:
-                if "[FINAL_APPROVED]" in (msg.contents[-1].text if hasattr(msg.contents[-1], 'text') else ""):
-                    return
-                break
+        if messages.control() == FINAL_APPROVED_MARKER:
+            return
 
-        response = await self.agent.run(messages)
+        response = await self._run_agent(messages, ctx)
         messages.extend(response.messages)
-        for msg in response.messages:
-            if msg.role == Role.ASSISTANT:
-                await ctx.add_event(
-                    AgentRunUpdateEvent(
-                        self.id,
-                        data=AgentRunResponseUpdate(
-                            contents=[TextContent(text=f"[CreativeDirector] {msg.contents[-1].text[:200]}...")],
-                            role=Role.ASSISTANT,
-                            response_id=str(uuid4()),
-                        ),
-                    )
-                )
+        await self._publish(ctx, response)
         await ctx.send_message(messages)
 
 
 # ---------------------------------------------------------------------------
 # Executor 4: Art Generator
 # ---------------------------------------------------------------------------
-class ArtGeneratorExecutor(Executor):
+class ArtGeneratorExecutor(PipelineExecutor):
     """Produces image generation prompts from the art concept brief."""
 
-    agent: ChatAgent
-
-    def __init__(self, agent: ChatAgent, id: str = "ArtGenerator"):
-        self.agent = agent
-        super().__init__(id=id)
+    stage = "ArtGenerator"
 
     @handler
+    @_instrumented
     async def handle_brief(
         self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]
     ) -> None:
-        response = await self.agent.run(messages)
+        # May run as a parallel branch — don't share the transcript, and leave
+        # compaction to the join (see Transcript)
+        messages = Transcript.of(messages).fork(compacts=TOPOLOGY != "parallel")
+        response = await self._run_agent(messages, ctx)
         messages.extend(response.messages)
-        for msg in response.messages:
-            if msg.role == Role.ASSISTANT:
-                await ctx.add_event(
-                    AgentRunUpdateEvent(
-                        self.id,
-                        data=AgentRunResponseUpdate(
-                            contents=[TextContent(text=f"[ArtGenerator] {msg.contents[-1].text[:200]}...")],
-                            role=Role.ASSISTANT,
-                            response_id=str(uuid4()),
-                        ),
-                    )
-                )
+        await self._publish(ctx, response)
         await ctx.send_message(messages)
 
 
 # ---------------------------------------------------------------------------
 # Executor 5: Copywriter
 # ---------------------------------------------------------------------------
-class CopywriterExecutor(Executor):
+class CopywriterExecutor(PipelineExecutor):
     """Crafts Instagram caption, hashtags, and CTA."""
 
-    agent: ChatAgent
-
-    def __init__(self, agent: ChatAgent, id: str = "Copywriter"):
-        self.agent = agent
-        super().__init__(id=id)
+    stage = "Copywriter"
 
     @handler
+    @_instrumented
     async def handle_prompts(
         self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]
     ) -> None:
-        response = await self.agent.run(messages)
+        # May run as a parallel branch — don't share the transcript, and leave
+        # compaction to the join (see Transcript)
+        messages = Transcript.of(messages).fork(compacts=TOPOLOGY != "parallel")
+        response = await self._run_agent(messages, ctx)
         messages.extend(response.messages)
-        for msg in response.messages:
-            if msg.role == Role.ASSISTANT:
-                await ctx.add_event(
-                    AgentRunUpdateEvent(
-                        self.id,
-                        data=AgentRunResponseUpdate(
-                            contents=[TextContent(text=f"[Copywriter] {msg.contents[-1].text[:200]}...")],
-                            role=Role.ASSISTANT,
-                            response_id=str(uuid4()),
-                        ),
-                    )
-                )
+        await self._publish(ctx, response)
         await ctx.send_message(messages)
 
 
+# ---------------------------------------------------------------------------
+# Join: merges the parallel Art Generator / Copywriter branches
+# ---------------------------------------------------------------------------
+class PackageJoinExecutor(Executor):
+    """Waits for the branches rerun this cycle, then forwards the merged package."""
+
+    def __init__(self, id: str = "PackageJoin"):
+        super().__init__(id=id)
+
+    @handler
+    @_instrumented
+    async def handle_branch(
+        self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]
+    ) -> None:
+        source = ctx.get_source_executor_id()
+        await _update_run_state(ctx, BRANCH_RESULTS_KEY, {}, lambda results: results.update({source: messages}))
+
+        pending = await _get_run_state(ctx, PENDING_BRANCHES_KEY, list(BRANCH_STAGES))
+        results = await _get_run_state(ctx, BRANCH_RESULTS_KEY, {})
+        if not all(stage in results for stage in pending):
+            return
+
+        await ctx.set_shared_state(BRANCH_RESULTS_KEY, {})
+        await ctx.set_shared_state(PENDING_BRANCHES_KEY, list(BRANCH_STAGES))
+        await ctx.send_message(_merge_branches([results[stage] for stage in pending]))
+
+
 # ---------------------------------------------------------------------------
 # Executor 6: Quality Reviewer (with feedback loop)
 # ---------------------------------------------------------------------------
-class QualityReviewerExecutor(Executor):
+class QualityReviewerExecutor(PipelineExecutor):
     """Reviews full package; approves or sends back for revision."""
 
-    agent: ChatAgent
-    review_count: int = 0
-
-    def __init__(self, agent: ChatAgent, id: str = "QualityReviewer"):
-        self.agent = agent
-        super().__init__(id=id)
+    stage = "QualityReviewer"
 
     @handler
+    @_instrumented
     async def handle_package(
         self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage], str]
     ) -> None:
-        self.review_count += 1
+        messages = Transcript.of(messages)
+        # The cycle counter is run-scoped: executors may be shared across runs
+        review_count = await _get_run_state(ctx, REVIEW_COUNT_KEY, 0) + 1
+        await ctx.set_shared_state(REVIEW_COUNT_KEY, review_count)
 
         # Add review instruction
         review_prompt = ChatMessage(
             role=Role.USER,
             text=(
-                f"[Review cycle {self.review_count}/{MAX_REVIEW_CYCLES}] "
+                f"[Review cycle {review_count}/{MAX_REVIEW_CYCLES}] "
                 "Review the complete content package above. "
                 "Respond with APPROVED or REVISION_NEEDED as the first word, "
-                "followed by your detailed assessment."
+                "followed by your detailed assessment. "
+                "Include one line per category in the form 'Category: score/10' for "
+                + ", ".join(REVIEW_CATEGORIES)
+                + "."
             ),
         )
-        review_messages = messages + [review_prompt]
 
-        response = await self.agent.run(review_messages)
+        response = await self._run_agent(messages, ctx, review_prompt)
         review_text = response.text or ""
+        scores = _parse_category_scores(review_text)
+        print(f"[QualityReviewer] Cycle {review_count} scores: {scores or '(not parsed)'}")
 
-        for msg in response.messages:
-            if msg.role == Role.ASSISTANT:
-                await ctx.add_event(
-                    AgentRunUpdateEvent(
-                        self.id,
-                        data=AgentRunResponseUpdate(
-                            contents=[TextContent(text=f"[QualityReviewer] {msg.contents[-1].text[:200]}...")],
-                            role=Role.ASSISTANT,
-                            response_id=str(uuid4()),
-                        ),
-                    )
-                )
+        await self._publish(ctx, response)
 
-        if "APPROVED" in review_text.upper() or self.review_count >= MAX_REVIEW_CYCLES:
+        if _is_approved(review_text) or review_count >= MAX_REVIEW_CYCLES:
             # Package approved — route to ImageCreator for final image generation
-            status = 'APPROVED' if 'APPROVED' in review_text.upper() else 'APPROVED (max cycles reached)'
+            status = 'APPROVED' if _is_approved(review_text) else 'APPROVED (max cycles reached)'
+            verdict = "approved" if _is_approved(review_text) else "max_cycles"
+            METRICS.inc("headlineart_review_verdicts_total", verdict=verdict)
+            METRICS.observe("headlineart_review_cycles", review_count)
             approved_summary = (
-                f"Review cycle: {self.review_count}\n"
+                f"Review cycle: {review_count}\n"
                 f"Status: {status}\n\n"
                 f"{review_text}"
             )
             approved_msg = ChatMessage(
                 role=Role.USER,
-                text=f"[FINAL_APPROVED]\n\n{approved_summary}",
+                text=f"{FINAL_APPROVED_MARKER}\n\n{approved_summary}",
             )
             messages.extend(response.messages)
             messages.append(approved_msg)
             await ctx.send_message(messages)
         else:
-            # Send back to Creative Director with revision feedback
+            # Send back to the stages that own a failing category;
+            # the other stages keep their previous output
+            rerun = _revision_stages(scores)
+            METRICS.inc("headlineart_review_verdicts_total", verdict="revision")
+            await ctx.set_shared_state(
+                PENDING_BRANCHES_KEY, [stage for stage in BRANCH_STAGES if stage in rerun]
+            )
+            await self._emit(ctx, f"[QualityReviewer] Revision needed — rerunning {', '.join(rerun)}")
             revision_msg = ChatMessage(
                 role=Role.USER,
                 text=(
-                    f"[REVISION REQUESTED — Cycle {self.review_count}]\n"
+                    f"{REVISION_MARKER} REQUESTED — Cycle {review_count} — Rerun: {', '.join(rerun)}]\n"
                     f"The quality reviewer has requested revisions. "
                     f"Please revise your work based on this feedback:\n\n{review_text}"
                 ),
@@ -314,28 +2602,121 @@ class QualityReviewerExecutor(Executor):
 # ---------------------------------------------------------------------------
 # Executor 7: Image Creator (generates the final artwork)
 # ---------------------------------------------------------------------------
-class ImageCreatorExecutor(Executor):
+# Generic abstract art prompt used if the extracted one is blocked (or, when
+# hedging, if it is slow)
+FALLBACK_IMAGE_PROMPT = (
+    "Abstract digital artwork with flowing organic shapes, vibrant gradients "
+    "of teal, coral, and gold, surreal dreamlike atmosphere, soft glowing light, "
+    "modern contemporary art style, Instagram aesthetic, 1024x1024"
+)
+
+
+class ImageCreatorExecutor(PipelineExecutor):
     """Generates the final artwork image using gpt-image-1.5."""
 
-    agent: ChatAgent
-    image_client: AsyncAzureOpenAI
+    stage = "ImageCreator"
+    image_client: "AsyncAzureOpenAI"
 
-    def __init__(self, agent: ChatAgent, image_client: AsyncAzureOpenAI, id: str = "ImageCreator"):
-        self.agent = agent
+    def __init__(self, agent: ChatAgent, image_client: "AsyncAzureOpenAI", id: str | None = None):
         self.image_client = image_client
-        super().__init__(id=id)
+        super().__init__(agent, id=id)
+
+    async def _attempt(self, prompt: str, prompt_kind: str):
+        """One images.generate call through the shared scheduler, recorded per prompt kind."""
+        print(f"[ImageCreator] {prompt_kind} prompt: endpoint={IMAGE_ENDPOINT} model={IMAGE_MODEL}")
+        print(f"[ImageCreator] {prompt_kind} prompt (first 200 chars): {prompt[:200]}")
+        try:
+            with METRICS.span("headlineart_image_generate_seconds", prompt=prompt_kind):
+                response = await IMAGE_SCHEDULER.generate(
+                    self.image_client,
+                    model=IMAGE_MODEL,
+                    prompt=prompt,
+                    size="1024x1024",
+                    n=1,
+                )
+        except asyncio.CancelledError:
+            METRICS.inc("headlineart_image_attempts_total", prompt=prompt_kind, outcome="cancelled")
+            raise
+        except Exception as e:
+            import traceback
+            kind = _classify_image_error(e)
+            METRICS.inc("headlineart_image_attempts_total", prompt=prompt_kind, outcome=kind)
+            print(f"[ImageCreator] {prompt_kind} prompt ERROR ({kind}): {type(e).__name__}: {e}")
+            traceback.print_exc()
+            raise
+        METRICS.inc("headlineart_image_attempts_total", prompt=prompt_kind, outcome="success")
+        return response
+
+    async def _generate_sequential(self, ctx: WorkflowContext, prompts: list[str]):
+        """Try each prompt in turn; move on to the next only after a moderation rejection."""
+        for attempt, prompt in enumerate(prompts):
+            prompt_kind = "primary" if attempt == 0 else "fallback"
+            try:
+                return await self._attempt(prompt, prompt_kind), prompt_kind
+            except Exception as e:
+                # Throttling / outages are not the prompt's fault — the fallback would not help
+                if attempt == len(prompts) - 1 or _classify_image_error(e) != "moderation":
+                    raise
+                print("[ImageCreator] Retrying with fallback prompt...")
+                await self._emit(
+                    ctx, "[ImageCreator] Prompt was blocked by content filter, retrying with safer prompt..."
+                )
+
+    async def _generate_hedged(self, ctx: WorkflowContext, prompts: list[str], delay: float):
+        """Race the fallback prompt against a primary prompt that is slower than `delay`.
+
+        The first accepted image wins and the other request is cancelled. If
+        the primary settles before the delay, this behaves like
+        _generate_sequential (recorded as hedge result "skipped").
+        """
+        primary, fallback = prompts
+        tasks = {asyncio.create_task(self._attempt(primary, "primary")): "primary"}
+        error: BaseException | None = None
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=delay) if delay > 0 else (set(), set(tasks))
+            if done:
+                METRICS.inc("headlineart_image_hedge_total", result="skipped")
+                task = done.pop()
+                if task.exception() is None:
+                    return task.result(), "primary"
+                if _classify_image_error(task.exception()) != "moderation":
+                    raise task.exception()
+                await self._emit(
+                    ctx, "[ImageCreator] Prompt was blocked by content filter, retrying with safer prompt..."
+                )
+                return await self._attempt(fallback, "fallback"), "fallback"
+
+            print(f"[ImageCreator] Primary prompt pending after {delay:.1f}s, hedging with fallback prompt")
+            hedge = asyncio.create_task(self._attempt(fallback, "fallback"))
+            tasks[hedge] = "fallback"
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = tasks[task]
+                        METRICS.inc(
+                            "headlineart_image_hedge_total",
+                            result="primary_won" if winner == "primary" else "hedge_won",
+                        )
+                        return task.result(), winner
+                    error = task.exception() if error is None or tasks[task] == "primary" else error
+        finally:
+            for task in tasks:
+                task.cancel()  # the loser (a no-op for finished tasks)
+        METRICS.inc("headlineart_image_hedge_total", result="both_failed")
+        raise error
 
     @handler
+    @_instrumented
     async def handle_final(
         self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage], str]
     ) -> None:
+        started = time.perf_counter()
+        messages = Transcript.of(messages)
         # Only process approved packages, skip revision requests
-        for msg in reversed(messages):
-            if msg.role == Role.USER and msg.contents:
-                last_text = msg.contents[-1].text if hasattr(msg.contents[-1], 'text') else ""
-                if "[REVISION" in last_text:
-                    return  # Not for us — this is a revision going to CreativeDirector
-                break
+        if messages.control() == REVISION_MARKER:
+            return  # Not for us — this is a revision going to CreativeDirector
 
         # Step 1: Use the agent to extract a safe, simplified image prompt
         extract_msg = ChatMessage(
@@ -353,146 +2734,340 @@ class ImageCreatorExecutor(Executor):
                 "Return ONLY the prompt text, nothing else."
             ),
         )
-        prompt_messages = messages + [extract_msg]
-        response = await self.agent.run(prompt_messages)
+        response = await self._run_agent(messages, ctx, extract_msg)
         image_prompt = response.text or "Abstract digital art with flowing gradients of blue and gold, surreal landscape, dreamy atmosphere"
 
-        # Truncate to avoid overly complex prompts that trigger moderation
-        if len(image_prompt) > 800:
-            image_prompt = image_prompt[:800]
+        # Strip blocklisted names/brands/violence locally (a rejection costs a full
+        # remote call) and cap the length at a sentence boundary
+        image_prompt, precheck_hits = _precheck_image_prompt(image_prompt)
+        if precheck_hits:
+            print(f"[ImageCreator] Pre-check rewrote {len(precheck_hits)} span(s): {sorted(set(precheck_hits))}")
+        image_prompt = image_prompt or FALLBACK_IMAGE_PROMPT
 
-        await ctx.add_event(
-            AgentRunUpdateEvent(
-                self.id,
-                data=AgentRunResponseUpdate(
-                    contents=[TextContent(text=f"[ImageCreator] Extracting prompt and generating image...")],
-                    role=Role.ASSISTANT,
-                    response_id=str(uuid4()),
-                ),
-            )
-        )
+        await self._emit(ctx, "[ImageCreator] Extracting prompt and generating image...")
 
-        # Step 2: Generate the image with gpt-image-1.5 (with moderation retry)
+        # Step 2: Generate the image with gpt-image-1.5 (with moderation retry, optionally hedged)
         image_path_str = "(image generation failed)"
-        prompts_to_try = [
-            image_prompt,
-            # Fallback: a generic abstract art prompt if the first one is blocked
-            (
-                "Abstract digital artwork with flowing organic shapes, vibrant gradients "
-                "of teal, coral, and gold, surreal dreamlike atmosphere, soft glowing light, "
-                "modern contemporary art style, Instagram aesthetic, 1024x1024"
-            ),
-        ]
-
-        for attempt, prompt in enumerate(prompts_to_try):
-            try:
-                print(f"[ImageCreator] Attempt {attempt + 1}: endpoint={IMAGE_ENDPOINT}")
-                print(f"[ImageCreator] Attempt {attempt + 1}: model={IMAGE_MODEL}")
-                print(f"[ImageCreator] Attempt {attempt + 1}: prompt (first 200 chars): {prompt[:200]}")
-                img_response = await self.image_client.images.generate(
-                    model=IMAGE_MODEL,
-                    prompt=prompt,
-                    size="1024x1024",
-                    n=1,
-                )
-                print(f"[ImageCreator] API response received, data items: {len(img_response.data)}")
-
-                # Save the image
-                OUTPUT_DIR.mkdir(exist_ok=True)
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                image_path = OUTPUT_DIR / f"quadro_{timestamp}.png"
-
-                image_data = base64.b64decode(img_response.data[0].b64_json)
-                image_path.write_bytes(image_data)
-                image_path_str = str(image_path)
-                print(f"[ImageCreator] Image saved: {image_path_str} ({len(image_data)} bytes)")
-
-                await ctx.add_event(
-                    AgentRunUpdateEvent(
-                        self.id,
-                        data=AgentRunResponseUpdate(
-                            contents=[TextContent(text=f"[ImageCreator] Image saved to: {image_path_str}")],
-                            role=Role.ASSISTANT,
-                            response_id=str(uuid4()),
-                        ),
-                    )
-                )
-                break  # Success — stop retrying
-            except Exception as e:
-                import traceback
-                print(f"[ImageCreator] Attempt {attempt + 1} ERROR: {type(e).__name__}: {e}")
-                traceback.print_exc()
-                if attempt == len(prompts_to_try) - 1:
-                    # All attempts failed
-                    await ctx.add_event(
-                        AgentRunUpdateEvent(
-                            self.id,
-                            data=AgentRunResponseUpdate(
-                                contents=[TextContent(text=f"[ImageCreator] Image generation error after {attempt + 1} attempts: {type(e).__name__}: {e}")],
-                                role=Role.ASSISTANT,
-                                response_id=str(uuid4()),
-                            ),
-                        )
-                    )
+        image_size = 0
+        variants: list[tuple[str, str, int]] = []
+        reused_line = ""
+        prompt_kind = similarity = None
+        prompts_to_try = [image_prompt, FALLBACK_IMAGE_PROMPT]
+
+        try:
+            image_path = _new_image_path()
+            # A near-duplicate of a recent prompt reuses that artwork instead of a new generation
+            similarity = await _reuse_image_async(image_prompt, image_path)
+            if similarity is not None:
+                image_size = image_path.stat().st_size
+                reused_line = f"Reused: stored image of a similar prompt (similarity {similarity:.2f})\n"
+                print(f"[ImageCreator] Reusing stored image (similarity {similarity:.2f})")
+            else:
+                if IMAGE_HEDGE_DELAY is None:
+                    img_response, prompt_kind = await self._generate_sequential(ctx, prompts_to_try)
                 else:
-                    print(f"[ImageCreator] Retrying with fallback prompt...")
-                    await ctx.add_event(
-                        AgentRunUpdateEvent(
-                            self.id,
-                            data=AgentRunResponseUpdate(
-                                contents=[TextContent(text=f"[ImageCreator] Prompt was blocked by content filter, retrying with safer prompt...")],
-                                role=Role.ASSISTANT,
-                                response_id=str(uuid4()),
-                            ),
-                        )
-                    )
+                    img_response, prompt_kind = await self._generate_hedged(ctx, prompts_to_try, IMAGE_HEDGE_DELAY)
+                print(
+                    f"[ImageCreator] API response received ({prompt_kind} prompt), data items: {len(img_response.data)}"
+                )
+                if precheck_hits and prompt_kind == "primary":
+                    METRICS.inc("headlineart_image_precheck_rewrites_accepted_total")
+
+                # Save the image (decode + write happen on the image I/O pool)
+                image_size = await _save_image_async(img_response.data[0].b64_json, image_path)
+                if prompt_kind == "primary":  # the generic fallback says nothing about this prompt
+                    await _remember_image_async(image_prompt, image_path)
+            image_path_str = str(image_path)
+            print(f"[ImageCreator] Image saved: {image_path_str} ({image_size} bytes)")
+
+            await self._emit(ctx, f"[ImageCreator] Image saved to: {image_path_str}")
+
+            if _VARIANT_SPECS:
+                try:
+                    variants = await _render_variants_async(image_path)
+                    print(f"[ImageCreator] Variants saved: {[path for _, path, _ in variants]}")
+                except Exception as e:
+                    # Variants are a convenience — never fail the run over them
+                    print(f"[ImageCreator] Variant encoding failed: {type(e).__name__}: {e}")
+        except Exception as e:
+            await self._emit(ctx, f"[ImageCreator] Image generation error: {type(e).__name__}: {e}")
 
         # Step 3: Yield final output
         # Extract the approved summary from the last [FINAL_APPROVED] message
-        approved_text = ""
-        for msg in reversed(messages):
-            if msg.role == Role.USER and msg.contents:
-                t = msg.contents[-1].text if hasattr(msg.contents[-1], 'text') else ""
-                if "[FINAL_APPROVED]" in t:
-                    approved_text = t.replace("[FINAL_APPROVED]", "").strip()
-                    break
+        approved = messages.latest(FINAL_APPROVED_MARKER)
+        approved_text = approved.text.removeprefix(FINAL_APPROVED_MARKER).strip() if approved else ""
 
+        prompt_tokens = await _get_run_state(ctx, PROMPT_TOKENS_KEY, {})
+        variant_lines = "".join(f"Variant {name}: {path} ({size} bytes)\n" for name, path, size in variants)
         final_output = (
             f"=== HEADLINEART — FINAL PACKAGE ===\n\n"
-            f"Image: {image_path_str}\n"
-            f"Prompt: {image_prompt[:300]}\n\n"
+            f"Image: {image_path_str}{f' ({image_size} bytes)' if image_size else ''}\n"
+            f"{variant_lines}"
+            f"{reused_line}"
+            f"Prompt: {image_prompt[:300]}\n"
+            f"{_format_prompt_tokens(prompt_tokens)}\n\n"
             f"{approved_text}"
         )
+        if GALLERY_MANIFEST is not None and image_size:
+            await self._record_gallery(
+                ctx, image_path, variants, image_prompt, prompt_kind, similarity, time.perf_counter() - started
+            )
         await ctx.yield_output(final_output)
 
+    async def _record_gallery(
+        self,
+        ctx: WorkflowContext,
+        image_path: Path,
+        variants: list[tuple[str, str, int]],
+        prompt: str,
+        prompt_kind: str | None,
+        similarity: float | None,
+        elapsed: float,
+    ) -> None:
+        """Append this run's artwork to GALLERY_MANIFEST in the background; never fails the run.
+
+        The record is assembled from the run state here; hashing, the thumbnail
+        and the insert happen in a background task (see _GALLERY_TASKS), off
+        the run's critical path.
+        """
+        artifacts = await _get_run_state(ctx, ARTIFACTS_KEY, {})
+        copy = artifacts.get("Copywriter", "")
+        review = artifacts.get("QualityReviewer", "")
+        theme = _extract_section(artifacts.get("NewsAnalyst", ""), "unifying theme", "theme")
+        scores = _parse_category_scores(review)
+        overall = re.search(r"overall[^\d\n]{0,30}?(\d+(?:\.\d+)?)", review, re.IGNORECASE)
+        if overall:
+            scores["Overall"] = float(overall.group(1))
+        stage_seconds = await _get_run_state(ctx, STAGE_SECONDS_KEY, {})
+        record = {
+            "theme": re.split(r"\s+[—–-]\s+|(?<=[.!?])\s|\n", theme)[0].strip(' "“”')[:120] or None,
+            "image_path": image_path,
+            "variants": {name: {"path": path, "bytes": size} for name, path, size in variants},
+            "prompt": prompt,
+            "prompt_kind": prompt_kind or "reused",
+            "reused": similarity,
+            "caption": _extract_section(copy, "primary caption", "caption") or None,
+            "hashtags": list(dict.fromkeys(re.findall(r"(?<![\w#])#\w+", copy))),
+            "scores": scores,
+            "review_cycles": await _get_run_state(ctx, REVIEW_COUNT_KEY, 0),
+            "stage_seconds": {**stage_seconds, self.id: stage_seconds.get(self.id, 0.0) + elapsed},
+            "prompt_tokens": await _get_run_state(ctx, PROMPT_TOKENS_KEY, {}),
+        }
+        task = asyncio.create_task(_append_gallery_record(GALLERY_MANIFEST, record))
+        _GALLERY_TASKS.add(task)
+        task.add_done_callback(_GALLERY_TASKS.discard)
+
+
+# ---------------------------------------------------------------------------
+# Batch mode: one news scan, one creative branch per artwork
+# ---------------------------------------------------------------------------
+# Trigger for the shared scout run of a batch (constant, so it hits SCOUT_CACHE)
+BATCH_TRIGGER = "Find today's most impactful, visually evocative news stories."
+
+# "/batch 3" or "/batch watercolor | neon noir | ..." as the request text
+_BATCH_PATTERN = re.compile(r"^\s*/batch\s+(.+?)\s*$", re.DOTALL)
+
+
+@dataclass
+class BatchUpstream:
+    """Result of a batch's shared News Scout + News Analyst run."""
+
+    messages: list[ChatMessage]
+    artifacts: dict[str, str]
+    prompt_tokens: dict[str, list[int]]
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class BatchBranch:
+    """Input of one creative branch: the shared upstream result plus its direction."""
+
+    upstream: BatchUpstream
+    direction: str
+
+
+class BatchUpstreamExecutor(Executor):
+    """Ends the upstream run: yields the transcript and run state for the branches."""
+
+    def __init__(self, id: str = "BatchUpstream"):
+        super().__init__(id=id)
+
+    @handler
+    async def collect(self, messages: list[ChatMessage], ctx: WorkflowContext[Never, BatchUpstream]) -> None:
+        artifacts = await _get_run_state(ctx, ARTIFACTS_KEY, {})
+        prompt_tokens = await _get_run_state(ctx, PROMPT_TOKENS_KEY, {})
+        stage_seconds = await _get_run_state(ctx, STAGE_SECONDS_KEY, {})
+        await ctx.yield_output(BatchUpstream(Transcript.of(messages).fork(), dict(artifacts), dict(prompt_tokens), dict(stage_seconds)))
+
+
+class BatchBranchExecutor(Executor):
+    """Starts a branch: restores the upstream run state and adds the branch's direction."""
+
+    def __init__(self, id: str = "BatchBranch"):
+        super().__init__(id=id)
+
+    @handler
+    async def start(self, branch: BatchBranch, ctx: WorkflowContext[list[ChatMessage]]) -> None:
+        upstream = branch.upstream
+        await ctx.set_shared_state(ARTIFACTS_KEY, {**upstream.artifacts, "BatchDirection": branch.direction})
+        await ctx.set_shared_state(
+            PROMPT_TOKENS_KEY, {stage: list(tokens) for stage, tokens in upstream.prompt_tokens.items()}
+        )
+        await ctx.set_shared_state(STAGE_SECONDS_KEY, dict(upstream.stage_seconds))
+        direction_msg = ChatMessage(
+            role=Role.USER,
+            text=f"[Batch direction] This artwork is one of several from today's news. {branch.direction}",
+        )
+        messages = Transcript.of(upstream.messages).fork()  # branches share the upstream messages
+        messages.append(direction_msg)
+        await ctx.send_message(messages)
+
+
+def batch_directions(request: str) -> list[str]:
+    """Directions for "/batch" — a count (one artwork per top story) or "|"-separated styles."""
+    request = request.strip()
+    if request.isdigit():
+        directions = [
+            f"Build the concept around story #{i + 1} of the analyst's ranking." for i in range(int(request))
+        ]
+    else:
+        directions = [f"Style: {style.strip()}" for style in request.split("|") if style.strip()]
+    if not 1 <= len(directions) <= BATCH_MAX_SIZE:
+        raise ValueError(f"A batch needs 1 to {BATCH_MAX_SIZE} artworks, got {len(directions)}")
+    return directions
+
+
+def _parse_batch_request(messages) -> tuple[list[str], str]:
+    """Directions of a "/batch" request and an error to answer with instead (both empty otherwise)."""
+    batch = _BATCH_PATTERN.match(_request_text(messages))
+    if batch is None:
+        return [], ""
+    try:
+        return batch_directions(batch.group(1)), ""
+    except ValueError as e:
+        return [], f"[Batch] {e}"
+
+
+async def run_batch(
+    create_workflow: Callable[..., Workflow],
+    directions: list[str],
+    trigger: str = BATCH_TRIGGER,
+    max_concurrency: int = BATCH_CONCURRENCY,
+) -> list[str]:
+    """Run the scout and analyst once, then one creative branch per direction.
+
+    Branches (Creative Director → … → Image Creator, with their own review
+    loop) run at most `max_concurrency` at a time. Returns the final package
+    of every branch, in the order of `directions`; a failed branch yields an
+    error line instead of stopping the batch.
+    """
+    print(f"[Batch] Scanning news once for {len(directions)} artworks")
+    upstream_run = await create_workflow("upstream").run([ChatMessage(role=Role.USER, text=trigger)])
+    upstream = next((o for o in upstream_run.get_outputs() if isinstance(o, BatchUpstream)), None)
+    if upstream is None:
+        raise RuntimeError("The batch's news scan produced no output")
+
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def branch(index: int, direction: str) -> str:
+        async with slots:
+            print(f"[Batch] Artwork {index + 1}/{len(directions)}: {direction}")
+            try:
+                result = await create_workflow("branch").run(BatchBranch(upstream, direction))
+            except Exception as e:
+                return f"[Batch] Artwork {index + 1} failed: {type(e).__name__}: {e}"
+            packages = [o for o in result.get_outputs() if isinstance(o, str)]
+            return packages[-1] if packages else f"[Batch] Artwork {index + 1} produced no package"
+
+    return list(await asyncio.gather(*(branch(i, d) for i, d in enumerate(directions))))
+
 
 # ---------------------------------------------------------------------------
 # Build the workflow
 # ---------------------------------------------------------------------------
-async def build_workflow():
-    """Create and return the multi-agent workflow."""
+# Agent name → spec file, in pipeline order
+AGENT_SPECS = {
+    "NewsScout": "01_news_scout.md",
+    "NewsAnalyst": "02_news_analyst.md",
+    "CreativeDirector": "03_creative_director.md",
+    "ArtGenerator": "04_art_generator.md",
+    "Copywriter": "05_copywriter.md",
+    "QualityReviewer": "06_quality_reviewer.md",
+    "ImageCreator": "07_image_creator.md",
+}
+
+
+async def build_workflow_factory(checkpoint_storage: CheckpointStorage | None = None) -> Callable[..., Workflow]:
+    """Create the clients and agents once; return a factory that builds a fresh workflow per run.
+
+    Agents are stateless between runs and are shared; executors and the
+    workflow itself are created per run, since a Workflow can only execute
+    one run at a time.
+    """
+
+    if PIPELINE_MODE not in ("transcript", "artifacts"):
+        raise ValueError(f"HEADLINEART_PIPELINE_MODE must be 'transcript' or 'artifacts', got '{PIPELINE_MODE}'")
+    if TOPOLOGY not in ("sequential", "parallel"):
+        raise ValueError(f"HEADLINEART_TOPOLOGY must be 'sequential' or 'parallel', got '{TOPOLOGY}'")
+
+    with _startup_phase("imports"):
+        import aiohttp
+        import httpx
+        from azure.ai.projects.aio import AIProjectClient
+        from azure.core.pipeline.transport import AioHttpTransport
+        from azure.identity.aio import DefaultAzureCredential
+        from openai import AsyncAzureOpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
+
+        PooledAzureAIClient = _pooled_azure_ai_client_class()
+
+    with _startup_phase("credential"):
+        credential = DefaultAzureCredential()
+
+    with _startup_phase("clients"):
+        # One pooled HTTP client shared by all agents and the image client
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+            )
+        )
 
-    credential = DefaultAzureCredential()
+        # Create Azure OpenAI client for image generation (gpt-image-1.5)
+        # Key-based auth is disabled; use Entra ID token auth instead
+        image_client = AsyncAzureOpenAI(
+            azure_endpoint=IMAGE_ENDPOINT,
+            api_version="2025-04-01-preview",
+            azure_ad_token_provider=CachedTokenProvider(credential, "https://cognitiveservices.azure.com/.default"),
+            http_client=http_client,
+            # IMAGE_SCHEDULER owns pacing and retries; SDK retries would bypass its token bucket
+            max_retries=0,
+        )
 
-    # Create Azure OpenAI client for image generation (gpt-image-1.5)
-    # Key-based auth is disabled; use Entra ID token auth instead
-    sync_credential = SyncDefaultAzureCredential()
-    token_provider = get_bearer_token_provider(
-        sync_credential, "https://cognitiveservices.azure.com/.default"
-    )
-    image_client = AsyncAzureOpenAI(
-        azure_endpoint=IMAGE_ENDPOINT,
-        api_version="2025-04-01-preview",
-        azure_ad_token_provider=token_provider,
-    )
+        # Shared Foundry project client (agent management) and OpenAI client (responses)
+        project_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_MAX_CONNECTIONS, keepalive_timeout=HTTP_KEEPALIVE_SECONDS)
+        )
+        project_client = AIProjectClient(
+            endpoint=ENDPOINT,
+            credential=credential,
+            transport=AioHttpTransport(session=project_session, session_owner=False),
+        )
+        openai_client = AsyncOpenAI(
+            base_url=ENDPOINT.rstrip("/") + "/openai",
+            default_query={"api-version": FOUNDRY_API_VERSION},
+            api_key=CachedTokenProvider(credential, "https://ai.azure.com/.default"),
+            http_client=http_client,
+        )
 
-    # Create 7 AzureAI clients + agents, each with spec-driven instructions
+    # Create 7 AzureAI clients + agents, each with spec-driven instructions,
+    # all on top of the shared project and OpenAI clients
     async def create_agent(spec_file: str, name: str, tools: list | None = None) -> ChatAgent:
         instructions = _load_spec(spec_file)
-        client = AzureAIClient(
-            project_endpoint=ENDPOINT,
+        client = PooledAzureAIClient(
+            project_client=project_client,
+            openai_client=openai_client,
             model_deployment_name=MODEL,
-            credential=credential,
         )
         kwargs: dict = {"name": name, "instructions": instructions}
         if tools:
@@ -502,61 +3077,249 @@ async def build_workflow():
     # Create Bing Grounding search tool for real-time news
     bing_tools: list | None = None
     if BING_CONNECTION_ID:
-        from agent_framework.azure import AzureAIClient as _AzureAIClient
-        bing_search_tool = _AzureAIClient.get_web_search_tool(bing_connection_id=BING_CONNECTION_ID)
+        bing_search_tool = PooledAzureAIClient.get_web_search_tool(bing_connection_id=BING_CONNECTION_ID)
         bing_tools = [bing_search_tool]
         print(f"[Setup] Bing Grounding enabled for NewsScout (connection: {BING_CONNECTION_ID[:40]}...)")
     else:
         print("[Setup] BING_CONNECTION_ID not set — NewsScout will use LLM knowledge only (no live web search)")
 
-    news_scout_agent = await create_agent("01_news_scout.md", "NewsScout", tools=bing_tools)
-    news_analyst_agent = await create_agent("02_news_analyst.md", "NewsAnalyst")
-    creative_director_agent = await create_agent("03_creative_director.md", "CreativeDirector")
-    art_generator_agent = await create_agent("04_art_generator.md", "ArtGenerator")
-    copywriter_agent = await create_agent("05_copywriter.md", "Copywriter")
-    quality_reviewer_agent = await create_agent("06_quality_reviewer.md", "QualityReviewer")
-    image_creator_agent = await create_agent("07_image_creator.md", "ImageCreator")
-
-    # Create executors
-    news_scout = NewsScoutExecutor(news_scout_agent)
-    news_analyst = NewsAnalystExecutor(news_analyst_agent)
-    creative_director = CreativeDirectorExecutor(creative_director_agent)
-    art_generator = ArtGeneratorExecutor(art_generator_agent)
-    copywriter = CopywriterExecutor(copywriter_agent)
-    quality_reviewer = QualityReviewerExecutor(quality_reviewer_agent)
-    image_creator = ImageCreatorExecutor(image_creator_agent, image_client)
-
-    # Build workflow with review loop + image generation:
-    # NewsScout → NewsAnalyst → CreativeDirector → ArtGenerator → Copywriter → QualityReviewer → ImageCreator
-    #                           ↑_______________________________________________|  (on REVISION_NEEDED)
-    workflow = (
-        WorkflowBuilder()
-        .set_start_executor(news_scout)
-        .add_edge(news_scout, news_analyst)
-        .add_edge(news_analyst, creative_director)
-        .add_edge(creative_director, art_generator)
-        .add_edge(art_generator, copywriter)
-        .add_edge(copywriter, quality_reviewer)
-        # Review loop: Quality Reviewer → Creative Director (on revision)
-        .add_edge(quality_reviewer, creative_director)
-        # Final step: Quality Reviewer → Image Creator (on approval)
-        .add_edge(quality_reviewer, image_creator)
-        .build()
-    )
+    # The agents are independent of each other, so create them concurrently
+    with _startup_phase("agents"):
+        created = await asyncio.gather(
+            *(
+                create_agent(spec_file, name, tools=bing_tools if name == "NewsScout" else None)
+                for name, spec_file in AGENT_SPECS.items()
+            )
+        )
 
-    return workflow
+    return workflow_factory(dict(zip(AGENT_SPECS, created)), image_client, checkpoint_storage)
+
+
+def workflow_factory(
+    agents: dict[str, ChatAgent],
+    image_client: "AsyncAzureOpenAI",
+    checkpoint_storage: CheckpointStorage | None = None,
+) -> Callable[..., Workflow]:
+    """Return a factory that wires the given agents (keyed by AGENT_SPECS name) into a fresh workflow.
+
+    Split out of build_workflow_factory so the same topology can be driven by
+    stand-in agents and image client (see benchmark.py). With a checkpoint
+    storage, every workflow checkpoints after each superstep.
+    """
+
+    def create_workflow(part: str = "full") -> Workflow:
+        """part: "full" pipeline, or for batches the shared "upstream" run or one creative "branch"."""
+        # Create executors
+        news_scout = NewsScoutExecutor(agents["NewsScout"])
+        story_dedup = StoryDedupExecutor() if STORY_DEDUP_THRESHOLD > 0 else None
+        news_analyst = NewsAnalystExecutor(agents["NewsAnalyst"])
+        creative_director = CreativeDirectorExecutor(agents["CreativeDirector"])
+        art_generator = ArtGeneratorExecutor(agents["ArtGenerator"])
+        copywriter = CopywriterExecutor(agents["Copywriter"])
+        quality_reviewer = QualityReviewerExecutor(agents["QualityReviewer"])
+        image_creator = ImageCreatorExecutor(agents["ImageCreator"], image_client)
+
+        def news_stages() -> WorkflowBuilder:
+            """Trigger → NewsScout → StoryDedup → NewsAnalyst (StoryDedup only when enabled)."""
+            trigger = TriggerExecutor()
+            builder = WorkflowBuilder().set_start_executor(trigger).add_edge(trigger, news_scout)
+            if story_dedup is None:
+                return builder.add_edge(news_scout, news_analyst)
+            return builder.add_edge(news_scout, story_dedup).add_edge(story_dedup, news_analyst)
+
+        # Build workflow with review loop + image generation:
+        # Trigger → NewsScout → StoryDedup → NewsAnalyst → CreativeDirector → ArtGenerator → Copywriter → QualityReviewer → ImageCreator
+        #                                                  ↑__________________↑______________↑_____________|  (on REVISION_NEEDED)
+        # The reviewer re-enters at the earliest stage owning a failing category.
+        if part == "upstream":
+            # Trigger → NewsScout → StoryDedup → NewsAnalyst → BatchUpstream (yields the shared result)
+            builder = news_stages().add_edge(news_analyst, BatchUpstreamExecutor())
+            if checkpoint_storage is not None:
+                builder = builder.with_checkpointing(checkpoint_storage)
+            return builder.build()
+        if part == "branch":
+            # BatchBranch → CreativeDirector → … (as below)
+            batch_branch = BatchBranchExecutor()
+            builder = WorkflowBuilder().set_start_executor(batch_branch).add_edge(batch_branch, creative_director)
+        elif part == "full":
+            builder = news_stages().add_edge(news_analyst, creative_director)
+        else:
+            raise ValueError(f"Unknown workflow part '{part}'")
+        if TOPOLOGY == "parallel":
+            # CreativeDirector ─┬→ ArtGenerator ─┬→ PackageJoin → QualityReviewer
+            #                   └→ Copywriter ───┘
+            package_join = PackageJoinExecutor()
+            builder = (
+                builder
+                .add_fan_out_edges(creative_director, [art_generator, copywriter])
+                .add_edge(art_generator, package_join)
+                .add_edge(copywriter, package_join)
+                .add_edge(package_join, quality_reviewer)
+            )
+        else:
+            builder = (
+                builder
+                .add_edge(creative_director, art_generator)
+                .add_edge(art_generator, copywriter)
+                .add_edge(copywriter, quality_reviewer)
+            )
+        builder = (
+            builder
+            # Review loop: Quality Reviewer → stage(s) to rerun (on revision)
+            .add_edge(quality_reviewer, creative_director, condition=_routes_to("CreativeDirector"))
+            .add_edge(quality_reviewer, art_generator, condition=_routes_to("ArtGenerator"))
+            .add_edge(quality_reviewer, copywriter, condition=_routes_to("Copywriter"))
+            # Final step: Quality Reviewer → Image Creator (on approval)
+            .add_edge(quality_reviewer, image_creator, condition=_routes_to("ImageCreator"))
+        )
+        if checkpoint_storage is not None:
+            builder = builder.with_checkpointing(checkpoint_storage)
+        workflow = builder.build()
+        return workflow
+
+    return create_workflow
+
+
+async def build_workflow() -> Workflow:
+    """Create and return the multi-agent workflow."""
+    return (await build_workflow_factory(create_checkpoint_storage()))()
 
 
 # ---------------------------------------------------------------------------
 # HTTP Server entrypoint
 # ---------------------------------------------------------------------------
+class PipelineAgent(BaseAgent):
+    """Agent facade for the HTTP server: one fresh workflow per run, bounded concurrency."""
+
+    def __init__(
+        self,
+        workflow_factory: Callable[..., Workflow],
+        max_concurrent_runs: int = MAX_CONCURRENT_RUNS,
+        checkpoint_storage: CheckpointStorage | None = None,
+    ):
+        super().__init__(name="HeadlineArt")
+        self._workflow_factory = workflow_factory
+        self._run_slots = asyncio.Semaphore(max_concurrent_runs)
+        self._checkpoint_storage = checkpoint_storage
+        self._active_runs = 0
+
+    @contextmanager
+    def _tracked_run(self):
+        """Count the run in headlineart_active_runs and time it into headlineart_run_seconds."""
+        self._active_runs += 1
+        METRICS.set("headlineart_active_runs", self._active_runs)
+        try:
+            with METRICS.span("headlineart_run_seconds"):
+                yield
+        finally:
+            self._active_runs -= 1
+            METRICS.set("headlineart_active_runs", self._active_runs)
+
+    async def _prepare(self, messages) -> tuple[Workflow | None, dict, str]:
+        """Build the run's workflow; turn a "/resume" request into checkpoint arguments.
+
+        Returns the workflow, the keyword arguments for its agent and a status
+        line naming the run (empty without checkpointing). A "/resume" that
+        cannot be honoured returns no workflow and the reason as the status.
+        """
+        resume = _RESUME_PATTERN.match(_request_text(messages))
+        if resume and self._checkpoint_storage is None:
+            return None, {}, (
+                "[Resume] Checkpointing is off — set HEADLINEART_CHECKPOINT_DIR or "
+                "HEADLINEART_CHECKPOINT_DB to make runs resumable."
+            )
+        workflow = self._workflow_factory()
+        if self._checkpoint_storage is None:
+            return workflow, {"messages": messages}, ""
+        if not resume:
+            return workflow, {"messages": messages}, f"[Run] {workflow.id} — resume with: /resume {workflow.id}"
+        run_id, checkpoint_id = resume.groups()
+        if checkpoint_id is None:
+            checkpoint_id = await find_resume_checkpoint(self._checkpoint_storage, run_id)
+        else:
+            checkpoint = await self._checkpoint_storage.load_checkpoint(checkpoint_id)
+            checkpoint_id = checkpoint_id if checkpoint is not None and checkpoint.workflow_id == run_id else None
+        if checkpoint_id is None:
+            return None, {}, f"[Resume] No resumable checkpoint for run {run_id}"
+        print(f"[Checkpoint] Resuming run {run_id} from checkpoint {checkpoint_id}")
+        return workflow, {"messages": None, "checkpoint_id": checkpoint_id}, f"[Run] {run_id} — resumed"
+
+    async def _run_batch(self, directions: list[str]) -> list[ChatMessage]:
+        """Run a "/batch" request; one assistant message per final package."""
+        packages = await run_batch(self._workflow_factory, directions)
+        return [
+            ChatMessage(role=Role.ASSISTANT, text=f"[Batch {i + 1}/{len(packages)}]\n{package}")
+            for i, package in enumerate(packages)
+        ]
+
+    async def run(self, messages=None, *, thread=None, **kwargs) -> AgentRunResponse:
+        gallery = _GALLERY_PATTERN.match(_request_text(messages))
+        if gallery:
+            # A metadata query, not a workflow run: no run slot needed
+            listing = await gallery_listing(gallery.group(1))
+            return AgentRunResponse(messages=[ChatMessage(role=Role.ASSISTANT, text=listing)])
+        directions, error = _parse_batch_request(messages)
+        if error:
+            return AgentRunResponse(messages=[ChatMessage(role=Role.ASSISTANT, text=error)])
+        async with self._run_slots:
+            with self._tracked_run():
+                if directions:
+                    return AgentRunResponse(messages=await self._run_batch(directions))
+                workflow, run_kwargs, status = await self._prepare(messages)
+                if workflow is None:
+                    return AgentRunResponse(messages=[ChatMessage(role=Role.ASSISTANT, text=status)])
+                response = await workflow.as_agent(self.name).run(thread=thread, **run_kwargs, **kwargs)
+                if status:
+                    response.messages.insert(0, ChatMessage(role=Role.ASSISTANT, text=status))
+                return response
+
+    async def run_stream(self, messages=None, *, thread=None, **kwargs) -> AsyncIterable[AgentRunResponseUpdate]:
+        gallery = _GALLERY_PATTERN.match(_request_text(messages))
+        if gallery:
+            listing = await gallery_listing(gallery.group(1))
+            yield AgentRunResponseUpdate(contents=[TextContent(text=listing)], role=Role.ASSISTANT, response_id=str(uuid4()))
+            return
+        directions, error = _parse_batch_request(messages)
+        if error:
+            yield AgentRunResponseUpdate(contents=[TextContent(text=error)], role=Role.ASSISTANT, response_id=str(uuid4()))
+            return
+        async with self._run_slots:
+            with self._tracked_run():
+                if directions:
+                    for message in await self._run_batch(directions):
+                        yield AgentRunResponseUpdate(
+                            contents=message.contents, role=Role.ASSISTANT, response_id=str(uuid4())
+                        )
+                    return
+                workflow, run_kwargs, status = await self._prepare(messages)
+                if workflow is None:
+                    yield AgentRunResponseUpdate(
+                        contents=[TextContent(text=status)], role=Role.ASSISTANT, response_id=str(uuid4())
+                    )
+                    return
+                if status:
+                    yield AgentRunResponseUpdate(
+                        contents=[TextContent(text=status + "\n")], role=Role.ASSISTANT, response_id=str(uuid4())
+                    )
+                async for update in workflow.as_agent(self.name).run_stream(thread=thread, **run_kwargs, **kwargs):
+                    yield update
+
+
 async def main():
     """Run the workflow as an HTTP server."""
-    from azure.ai.agentserver.agentframework import from_agent_framework
-
-    workflow = await build_workflow()
-    agent = workflow.as_agent()
-    await from_agent_framework(agent).run_async()
+    with _startup_phase("imports"):
+        from azure.ai.agentserver.agentframework import from_agent_framework
+
+    checkpoint_storage = create_checkpoint_storage()
+    workflow_factory = await build_workflow_factory(checkpoint_storage)
+    # Build one workflow up front so a broken graph fails at startup, not on the first request
+    with _startup_phase("workflow"):
+        workflow_factory()
+    with _startup_phase("server"):
+        server = from_agent_framework(PipelineAgent(workflow_factory, checkpoint_storage=checkpoint_storage))
+    print(f"[Startup] {_format_startup_timings()}")
+    await start_metrics()
+    await server.run_async()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,337 @@
+"""
+HeadlineArt Pipeline — Offline Benchmark
+
+Drives the real workflow topology from app.py with stand-in agents and a
+stand-in image client, so the orchestration overhead of the pipeline itself
+can be measured without Foundry or image endpoints (and without network).
+
+    python benchmark.py --concurrency 1,4,16 --runs 40 --agent-latency-ms 50
+    python benchmark.py --topology parallel --verdicts "revise=Copy Quality,approve"
+
+Reports throughput, p50/p95/p99 end-to-end latency and mean time per executor
+for each concurrency level.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import re
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from agent_framework import (
+    AgentRunResponse,
+    AgentRunResponseUpdate,
+    ChatMessage,
+    ExecutorCompletedEvent,
+    ExecutorInvokedEvent,
+    Role,
+    TextContent,
+    UsageDetails,
+)
+
+import app
+
+# 1x1 transparent PNG — enough for the image persistence path
+_FAKE_PNG_B64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+_REVIEW_CYCLE_PATTERN = re.compile(r"\[Review cycle (\d+)/")
+
+
+# ---------------------------------------------------------------------------
+# Stand-in agents and image client
+# ---------------------------------------------------------------------------
+class FakeAgent:
+    """ChatAgent stand-in with configurable latency and token counts."""
+
+    def __init__(self, name: str, latency: float, jitter: float, output_tokens: int, seed: int):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.output_tokens = output_tokens
+        self._rng = random.Random(f"{seed}:{name}")
+
+    async def _respond(self, messages: list[ChatMessage]) -> tuple[str, UsageDetails]:
+        delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(delay, 0.0))
+        text = self._reply(messages)
+        usage = UsageDetails(
+            input_token_count=app._estimate_tokens(messages),
+            output_token_count=len(text) // 4,
+        )
+        return text, usage
+
+    def _reply(self, messages: list[ChatMessage]) -> str:
+        return (f"{self.name} output. " * self.output_tokens)[: self.output_tokens * 4]
+
+    async def run(self, messages: list[ChatMessage], **kwargs) -> AgentRunResponse:
+        text, usage = await self._respond(messages)
+        return AgentRunResponse(
+            messages=[ChatMessage(role=Role.ASSISTANT, text=text, author_name=self.name)],
+            usage_details=usage,
+        )
+
+    async def run_stream(self, messages: list[ChatMessage], **kwargs):
+        text, _ = await self._respond(messages)
+        for start in range(0, len(text), 16):
+            yield AgentRunResponseUpdate(
+                contents=[TextContent(text=text[start : start + 16])],
+                role=Role.ASSISTANT,
+                author_name=self.name,
+            )
+
+
+class FakeReviewer(FakeAgent):
+    """Quality Reviewer stand-in that follows a fixed verdict per review cycle.
+
+    Each verdict is either None (approve) or the categories to fail; the last
+    verdict repeats for any further cycles.
+    """
+
+    def __init__(self, verdicts: list[list[str] | None], **kwargs):
+        super().__init__("QualityReviewer", **kwargs)
+        self.verdicts = verdicts
+
+    def _reply(self, messages: list[ChatMessage]) -> str:
+        match = _REVIEW_CYCLE_PATTERN.search(messages[-1].text or "")
+        cycle = int(match.group(1)) if match else 1
+        failing = self.verdicts[min(cycle, len(self.verdicts)) - 1]
+        lines = ["APPROVED" if failing is None else "REVISION_NEEDED"]
+        for category in app.REVIEW_CATEGORIES:
+            score = 3 if failing and category in failing else 8
+            lines.append(f"{category}: {score}/10")
+        return "\n".join(lines)
+
+
+class FakeImageClient:
+    """AsyncAzureOpenAI stand-in exposing images.generate()."""
+
+    class _Images:
+        def __init__(self, latency: float, reject_rate: float, seed: int):
+            self.latency = latency
+            self.reject_rate = reject_rate
+            self.rng = random.Random(seed)
+
+        async def generate(self, prompt: str = "", **kwargs):
+            # Rejections arrive only after the full latency, like the real filter
+            rejected = prompt != app.FALLBACK_IMAGE_PROMPT and self.rng.random() < self.reject_rate
+            await asyncio.sleep(self.latency)
+            if rejected:
+                raise ContentPolicyError()
+            item = type("Image", (), {"b64_json": _FAKE_PNG_B64})()
+            return type("ImagesResponse", (), {"data": [item]})()
+
+    def __init__(self, latency: float, reject_rate: float = 0.0, seed: int = 0):
+        self.images = self._Images(latency, reject_rate, seed)
+
+
+class ContentPolicyError(Exception):
+    """Moderation rejection shaped like openai.BadRequestError."""
+
+    status_code = 400
+    code = "content_policy_violation"
+
+
+def _parse_verdicts(spec: str) -> list[list[str] | None]:
+    """Parse "revise=Copy Quality+Art Concept,approve" into per-cycle verdicts."""
+    verdicts: list[list[str] | None] = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        if entry == "approve":
+            verdicts.append(None)
+            continue
+        action, _, categories = entry.partition("=")
+        failing = [category.strip() for category in categories.split("+") if category.strip()]
+        unknown = [category for category in failing if category not in app.REVIEW_CATEGORIES]
+        if action != "revise" or not failing or unknown:
+            raise ValueError(
+                f"Invalid verdict '{entry}': expected 'approve' or 'revise=<Category>[+<Category>...]' "
+                f"with categories from {', '.join(app.REVIEW_CATEGORIES)}"
+            )
+        verdicts.append(failing)
+    return verdicts or [None]
+
+
+# ---------------------------------------------------------------------------
+# Benchmark runner
+# ---------------------------------------------------------------------------
+def _percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+async def _timed_run(create_workflow) -> tuple[float, dict[str, float]]:
+    """Run one workflow; return its end-to-end latency and time spent per executor."""
+    workflow = create_workflow()
+    executor_time: dict[str, float] = defaultdict(float)
+    invoked: dict[str, float] = {}
+    started = time.perf_counter()
+    async for event in workflow.run_stream([ChatMessage(role=Role.USER, text="Create today's HeadlineArt.")]):
+        if isinstance(event, ExecutorInvokedEvent):
+            invoked.setdefault(event.executor_id, time.perf_counter())
+        elif isinstance(event, ExecutorCompletedEvent) and event.executor_id in invoked:
+            executor_time[event.executor_id] += time.perf_counter() - invoked.pop(event.executor_id)
+    return time.perf_counter() - started, executor_time
+
+
+async def _run_level(create_workflow, concurrency: int, runs: int) -> dict:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def bounded():
+        async with slots:
+            return await _timed_run(create_workflow)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(bounded() for _ in range(runs)))
+    wall = time.perf_counter() - started
+
+    latencies = [latency for latency, _ in results]
+    per_executor: dict[str, list[float]] = defaultdict(list)
+    for _, executor_time in results:
+        for executor_id, seconds in executor_time.items():
+            per_executor[executor_id].append(seconds)
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "wall": wall,
+        "throughput": runs / wall,
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "executors": {executor_id: statistics.mean(times) for executor_id, times in per_executor.items()},
+    }
+
+
+def _print_report(results: list[dict]) -> None:
+    print(f"{'conc':>5} {'runs':>5} {'runs/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for r in results:
+        print(
+            f"{r['concurrency']:>5} {r['runs']:>5} {r['throughput']:>8.2f} "
+            f"{r['p50'] * 1000:>9.1f} {r['p95'] * 1000:>9.1f} {r['p99'] * 1000:>9.1f}"
+        )
+
+    executor_ids = [name for name in (*app.AGENT_SPECS, "PackageJoin") if any(name in r["executors"] for r in results)]
+    print("\nMean time per executor per run (ms):")
+    print(f"{'executor':<18}" + "".join(f"{'c=' + str(r['concurrency']):>10}" for r in results))
+    for executor_id in executor_ids:
+        cells = "".join(f"{r['executors'].get(executor_id, 0.0) * 1000:>10.1f}" for r in results)
+        print(f"{executor_id:<18}{cells}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline HeadlineArt pipeline benchmark (no network).")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--runs", type=int, default=32, help="Workflow runs per concurrency level")
+    parser.add_argument("--agent-latency-ms", type=float, default=20.0, help="Simulated latency per agent call")
+    parser.add_argument("--agent-jitter-ms", type=float, default=0.0, help="Uniform +/- jitter per agent call")
+    parser.add_argument("--image-latency-ms", type=float, default=50.0, help="Simulated image generation latency")
+    parser.add_argument(
+        "--image-rate-per-minute", type=float, default=0.0, help="Image scheduler rate limit (default: unlimited)"
+    )
+    parser.add_argument(
+        "--image-reject-rate", type=float, default=0.0, help="Fraction of primary image prompts blocked by moderation"
+    )
+    parser.add_argument(
+        "--image-hedge-delay", type=float, default=None, help="Hedge image prompts after N seconds (default: off)"
+    )
+    parser.add_argument(
+        "--image-reuse-threshold", type=float, default=0.0, help="Image reuse cache similarity threshold (default: off)"
+    )
+    parser.add_argument("--output-tokens", type=int, default=400, help="Tokens per agent reply")
+    parser.add_argument(
+        "--transcript-token-budget", type=int, default=0, help="Run transcript token budget (default: unbounded)"
+    )
+    parser.add_argument(
+        "--verdicts",
+        default="approve",
+        help="Reviewer verdict per cycle, e.g. \"revise=Copy Quality+Art Concept,approve\"",
+    )
+    parser.add_argument("--topology", choices=("sequential", "parallel"), default=app.TOPOLOGY)
+    parser.add_argument("--mode", choices=("transcript", "artifacts"), default=app.PIPELINE_MODE)
+    parser.add_argument("--stream", action="store_true", help="Stream agent tokens (HEADLINEART_STREAM_TOKENS)")
+    parser.add_argument(
+        "--scout-cache-ttl", type=float, default=0.0, help="NewsScout cache TTL in seconds (default: cache off)"
+    )
+    parser.add_argument("--stage-cache", action="store_true", help="Memoize stage outputs in memory across runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--metrics", action="store_true", help="Also print the metrics registry (Prometheus text)")
+    args = parser.parse_args()
+
+    try:
+        levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+        verdicts = _parse_verdicts(args.verdicts)
+    except ValueError as e:
+        parser.error(str(e))
+
+    app.TOPOLOGY = args.topology
+    app.PIPELINE_MODE = args.mode
+    app.STREAM_TOKENS = args.stream
+    app.SCOUT_CACHE = app.ScoutCache(args.scout_cache_ttl) if args.scout_cache_ttl > 0 else None
+    app.STAGE_OUTPUT_CACHE = app.StageCache() if args.stage_cache else None
+    app.IMAGE_HEDGE_DELAY = args.image_hedge_delay
+    app.TRANSCRIPT_TOKEN_BUDGET = args.transcript_token_budget
+    app.IMAGE_SCHEDULER = app.ImageScheduler(args.image_rate_per_minute, burst=1, max_queue=max(levels) * 2)
+
+    agent_kwargs = {
+        "latency": args.agent_latency_ms / 1000,
+        "jitter": args.agent_jitter_ms / 1000,
+        "output_tokens": args.output_tokens,
+        "seed": args.seed,
+    }
+    agents = {
+        name: FakeReviewer(verdicts, **agent_kwargs) if name == "QualityReviewer" else FakeAgent(name, **agent_kwargs)
+        for name in app.AGENT_SPECS
+    }
+    create_workflow = app.workflow_factory(
+        agents, FakeImageClient(args.image_latency_ms / 1000, args.image_reject_rate, args.seed)
+    )
+
+    print(
+        f"[Benchmark] topology={args.topology} mode={args.mode} stream={args.stream} "
+        f"agent={args.agent_latency_ms:.0f}±{args.agent_jitter_ms:.0f}ms image={args.image_latency_ms:.0f}ms "
+        f"verdicts={args.verdicts} image_reject={args.image_reject_rate:.0%} hedge_delay={args.image_hedge_delay}"
+    )
+    lag_monitor = asyncio.create_task(app.monitor_event_loop_lag(0.05))
+    results = []
+    with tempfile.TemporaryDirectory(prefix="headlineart-bench-") as out_dir:
+        app.OUTPUT_DIR = Path(out_dir)
+        app.GALLERY_MANIFEST = app.Gallery(Path(out_dir) / "gallery.db")
+        app.IMAGE_REUSE_CACHE = (
+            app.ImageReuseCache(Path(out_dir) / "reuse", args.image_reuse_threshold)
+            if args.image_reuse_threshold > 0
+            else None
+        )
+        for concurrency in levels:
+            # The executors log every step; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                results.append(await _run_level(create_workflow, concurrency, max(args.runs, concurrency)))
+        # Finish background gallery inserts before the output directory goes away
+        await asyncio.gather(*app._GALLERY_TASKS)
+    lag_monitor.cancel()
+    print()
+    _print_report(results)
+
+    lag = app.METRICS.series("headlineart_event_loop_lag_seconds").get(())
+    if lag and lag.count:
+        print(f"\nEvent-loop lag: mean {lag.sum / lag.count * 1000:.1f}ms over {lag.count} samples")
+    hedge_series = app.METRICS.series("headlineart_image_hedge_total")
+    hedges = {dict(labels)["result"]: count for labels, count in hedge_series.items()}
+    if hedges:
+        print("Image hedging: " + ", ".join(f"{result} {count:.0f}" for result, count in sorted(hedges.items())))
+    compacted = sum(app.METRICS.series("headlineart_transcript_compacted_total").values())
+    if compacted:
+        print(f"Transcript compaction: {compacted:.0f} superseded messages summarized")
+    if args.metrics:
+        print()
+        print(app.METRICS.render_prometheus(), end="")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
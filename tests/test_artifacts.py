@@ -0,0 +1,22 @@
+"""Artifact-mode prompt assembly."""
+
+import sys
+from pathlib import Path
+
+from agent_framework import ChatMessage, Role
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def test_trigger_reaches_every_stage():
+    trigger = ChatMessage(role=Role.USER, text="Today's HeadlineArt, as a watercolor.")
+    messages = [trigger, ChatMessage(role=Role.ASSISTANT, text="stories", author_name="NewsScout")]
+    artifacts = {stage: f"{stage} output" for stage in app.AGENT_SPECS}
+    for stage in ("NewsAnalyst", "CreativeDirector", "ArtGenerator", "Copywriter", "QualityReviewer", "ImageCreator"):
+        prompt = app._artifact_prompt(stage, messages, artifacts)
+        assert prompt[0] is trigger
+        assert all(msg is not messages[1] for msg in prompt)  # the transcript itself stays out
+        expected = [f"## {app.ARTIFACT_TITLES[name]}" for name in app._stage_inputs(stage) if name in artifacts]
+        assert [msg.text.split(" (from ")[0] for msg in prompt[1 : 1 + len(expected)]] == expected
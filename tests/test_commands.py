@@ -0,0 +1,43 @@
+"""Chat commands that must be answered without starting a workflow run."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from agent_framework import ChatMessage, InMemoryCheckpointStorage, Role
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def _no_run():
+    raise AssertionError("the request must not start a workflow run")
+
+
+def _reply(agent: app.PipelineAgent, text: str) -> str:
+    response = asyncio.run(agent.run([ChatMessage(role=Role.USER, text=text)]))
+    return response.text
+
+
+def test_resume_without_checkpointing():
+    assert "Checkpointing is off" in _reply(app.PipelineAgent(_no_run), "/resume abc")
+
+
+def test_resume_unknown_run():
+    storage = InMemoryCheckpointStorage()
+    agent = app.PipelineAgent(lambda: type("Workflow", (), {"id": "new"})(), checkpoint_storage=storage)
+    assert "No resumable checkpoint for run abc" in _reply(agent, "/resume abc")
+    assert "No resumable checkpoint for run abc" in _reply(agent, "/resume abc def")
+
+
+def test_invalid_batch():
+    agent = app.PipelineAgent(_no_run, max_concurrent_runs=1)
+    for request in ("/batch 0", "/batch 99", "/batch | |"):
+        assert _reply(agent, request).startswith("[Batch] A batch needs 1 to")
+    assert agent._run_slots._value == 1
+
+
+def test_gallery_disabled(monkeypatch):
+    monkeypatch.setattr(app, "GALLERY_MANIFEST", None)
+    assert "gallery is disabled" in _reply(app.PipelineAgent(_no_run), "/gallery")
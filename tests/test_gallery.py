@@ -0,0 +1,35 @@
+"""Listing the gallery manifest with "/gallery"."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def test_listing_writes_and_links_thumbnails(tmp_path, monkeypatch):
+    gallery = app.Gallery(tmp_path / "gallery.db")
+    monkeypatch.setattr(app, "GALLERY_MANIFEST", gallery)
+    image = tmp_path / "artwork.png"
+    image.write_bytes(b"png")
+
+    async def scenario():
+        await gallery.add({"image_path": image, "theme": "Storm", "scores": {"Overall": 8.0}, "thumbnail": b"RIFFwebp"})
+        await gallery.add({"image_path": image, "theme": "Solar", "thumbnail": None})
+        return await app.gallery_listing("")
+
+    listing = asyncio.run(scenario())
+
+    thumbnail = tmp_path / "thumbnails" / "1.webp"
+    assert thumbnail.read_bytes() == b"RIFFwebp"
+    assert f"thumbnail: {thumbnail} (8 bytes)" in listing
+    assert "#2 " in listing and "thumbnail: none" in listing
+    assert not (tmp_path / "thumbnails" / "2.webp").exists()
+
+
+def test_listing_when_the_gallery_is_off(monkeypatch):
+    monkeypatch.setattr(app, "GALLERY_MANIFEST", None)
+
+    assert "HEADLINEART_GALLERY=true" in asyncio.run(app.gallery_listing(""))
@@ -0,0 +1,100 @@
+"""Hedged image generation: the first accepted image wins and the loser is cancelled."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+from benchmark import ContentPolicyError, FakeAgent  # noqa: E402
+
+PRIMARY = "Primary prompt: a storm over the harbour"
+
+
+class TimedImageClient:
+    """images.generate() stand-in with a latency (and optional error) per prompt kind."""
+
+    def __init__(self, primary: float, fallback: float, errors: dict[str, Exception] | None = None):
+        self.latency = {"primary": primary, "fallback": fallback}
+        self.errors = errors or {}
+        self.calls: list[str] = []
+        self.cancelled: list[str] = []
+        self.images = self
+
+    async def generate(self, prompt: str = "", **kwargs):
+        kind = "fallback" if prompt == app.FALLBACK_IMAGE_PROMPT else "primary"
+        self.calls.append(kind)
+        try:
+            await asyncio.sleep(self.latency[kind])
+        except asyncio.CancelledError:
+            self.cancelled.append(kind)
+            raise
+        if kind in self.errors:
+            raise self.errors[kind]
+        return kind
+
+
+class RecordingContext:
+    def __init__(self):
+        self.events = []
+
+    async def add_event(self, event):
+        self.events.append(event)
+
+
+def _count(name: str, **labels) -> float:
+    return app.METRICS.series(name).get(app.Metrics._key(labels), 0.0)
+
+
+def _hedge(client: TimedImageClient, delay: float):
+    agent = FakeAgent("ImageCreator", latency=0.0, jitter=0.0, output_tokens=20, seed=0)
+    creator = app.ImageCreatorExecutor(agent, client)
+    return asyncio.run(creator._generate_hedged(RecordingContext(), [PRIMARY, app.FALLBACK_IMAGE_PROMPT], delay))
+
+
+@pytest.fixture(autouse=True)
+def unlimited_scheduler(monkeypatch):
+    monkeypatch.setattr(app, "IMAGE_SCHEDULER", app.ImageScheduler(0))
+
+
+def test_fast_fallback_wins_and_cancels_the_slow_primary():
+    won = _count("headlineart_image_hedge_total", result="hedge_won")
+    cancelled = _count("headlineart_image_attempts_total", prompt="primary", outcome="cancelled")
+    client = TimedImageClient(primary=5.0, fallback=0.01)
+
+    assert _hedge(client, delay=0.05) == ("fallback", "fallback")
+    assert client.calls == ["primary", "fallback"]
+    assert client.cancelled == ["primary"]
+    assert _count("headlineart_image_hedge_total", result="hedge_won") == won + 1
+    assert _count("headlineart_image_attempts_total", prompt="primary", outcome="cancelled") == cancelled + 1
+
+
+def test_primary_that_finishes_first_cancels_the_hedge():
+    won = _count("headlineart_image_hedge_total", result="primary_won")
+    client = TimedImageClient(primary=0.1, fallback=5.0)
+
+    assert _hedge(client, delay=0.02) == ("primary", "primary")
+    assert client.cancelled == ["fallback"]
+    assert _count("headlineart_image_hedge_total", result="primary_won") == won + 1
+
+
+def test_primary_within_the_delay_skips_the_hedge():
+    skipped = _count("headlineart_image_hedge_total", result="skipped")
+    client = TimedImageClient(primary=0.01, fallback=0.01)
+
+    assert _hedge(client, delay=1.0) == ("primary", "primary")
+    assert client.calls == ["primary"]
+    assert _count("headlineart_image_hedge_total", result="skipped") == skipped + 1
+
+
+def test_both_failing_raises_the_primary_error():
+    client = TimedImageClient(
+        primary=0.1, fallback=0.01, errors={"primary": ContentPolicyError("blocked"), "fallback": RuntimeError("down")}
+    )
+
+    with pytest.raises(ContentPolicyError):
+        _hedge(client, delay=0.02)
+    assert client.cancelled == []
@@ -0,0 +1,70 @@
+"""Image reuse cache: similar prompts share an image, LRU eviction and restarts."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+STORM = "Abstract storm over a harbour, deep blue and silver swirls, glowing lighthouse beam, oil painting"
+STORM_AGAIN = "Abstract storm over a harbour, deep blue and silver swirls, glowing lighthouse beams, oil painting style"
+SOLAR = "Geometric sunrise of golden crystals on teal glass panels, minimalist vector art"
+
+
+def _image(tmp_path: Path, name: str, data: bytes = b"png") -> Path:
+    path = tmp_path / "run" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def _count(**labels) -> float:
+    return app.METRICS.series("headlineart_image_reuse_total").get(app.Metrics._key(labels), 0.0)
+
+
+def test_similar_prompts_reuse_the_image_and_others_miss(tmp_path, monkeypatch):
+    cache = app.ImageReuseCache(tmp_path / "reuse", threshold=0.7)
+    monkeypatch.setattr(app, "IMAGE_REUSE_CACHE", cache)
+    cache.store(STORM, _image(tmp_path, "storm.png", b"storm-pixels"))
+    hits, misses = _count(result="hit"), _count(result="miss")
+
+    hit = asyncio.run(app._reuse_image_async(STORM_AGAIN, tmp_path / "run" / "new.png"))
+    miss = asyncio.run(app._reuse_image_async(SOLAR, tmp_path / "run" / "other.png"))
+
+    assert hit is not None and hit >= 0.7
+    assert (tmp_path / "run" / "new.png").read_bytes() == b"storm-pixels"
+    assert miss is None and not (tmp_path / "run" / "other.png").exists()
+    assert (_count(result="hit"), _count(result="miss")) == (hits + 1, misses + 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = app.ImageReuseCache(tmp_path / "reuse", threshold=0.7, max_entries=2)
+    cache.store(STORM, _image(tmp_path, "storm.png"))
+    cache.store(SOLAR, _image(tmp_path, "solar.png"))
+    assert cache.lookup(STORM, tmp_path / "run" / "hit.png") is not None
+
+    evicted = cache.store("Pastel watercolour of a quiet mountain lake at dawn", _image(tmp_path, "lake.png"))
+
+    assert evicted == 1
+    assert cache.lookup(SOLAR, tmp_path / "run" / "solar-again.png") is None
+    assert cache.lookup(STORM, tmp_path / "run" / "storm-again.png") is not None
+    assert len(list((tmp_path / "reuse").glob("*.png"))) == 2
+
+
+def test_evicting_an_entry_keeps_the_runs_own_image(tmp_path):
+    cache = app.ImageReuseCache(tmp_path / "reuse", threshold=0.7, max_entries=1)
+    storm = _image(tmp_path, "storm.png")
+    cache.store(STORM, storm)
+    cache.store(SOLAR, _image(tmp_path, "solar.png"))
+
+    assert storm.exists()
+
+
+def test_index_survives_restarts(tmp_path):
+    app.ImageReuseCache(tmp_path / "reuse", threshold=0.7).store(STORM, _image(tmp_path, "storm.png"))
+
+    restarted = app.ImageReuseCache(tmp_path / "reuse", threshold=0.7)
+
+    assert restarted.lookup(STORM_AGAIN, tmp_path / "run" / "new.png") is not None
@@ -0,0 +1,27 @@
+"""Parsing HEADLINEART_IMAGE_VARIANTS."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def test_variants_are_parsed_with_a_default_quality():
+    assert app._parse_variant_specs("post=jpeg:1080:90, thumb=webp:256") == [
+        ("post", "jpeg", 1080, 90),
+        ("thumb", "webp", 256, 85),
+    ]
+    assert app._parse_variant_specs("") == []
+
+
+@pytest.mark.parametrize(
+    "entry",
+    ["post=jpeg:abc", "post=jpeg:1080:high", "post=gif:1080", "=jpeg:1080", "post=jpeg", "post=jpeg:0", "post=jpeg:1080:101"],
+)
+def test_malformed_variants_name_the_bad_entry(entry):
+    with pytest.raises(ValueError, match=f"Invalid image variant '{entry}' in HEADLINEART_IMAGE_VARIANTS"):
+        app._parse_variant_specs(f"thumb=webp:256,{entry}")
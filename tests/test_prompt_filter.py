@@ -0,0 +1,38 @@
+"""Local image prompt pre-moderation (specs/image_blocklist.txt)."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+FILTER = app.PromptFilter.from_file(Path(app.__file__).parent / "specs" / "image_blocklist.txt")
+
+
+@pytest.mark.parametrize(
+    "prompt",
+    ["A gun-metal sky over the harbor", "A shooting star over the city", "Shooting stars above a quiet lake"],
+)
+def test_harmless_phrases_are_kept(prompt):
+    assert FILTER.sanitize(prompt) == (prompt, [])
+
+
+@pytest.mark.parametrize(
+    "prompt, expected",
+    [
+        ("Bombs and guns in the square", "in the square"),
+        ("A city of guns, bombs, and smoke.", "A city of smoke."),
+        ("Smoke, guns.", "Smoke."),
+        ("A calm scene (gore) at night", "A calm scene at night"),
+        ("Two battles at dusk", "Two struggles at dusk"),
+        ("Soldiers on a war-torn street", "figures on a weathered street"),
+        ("Nike's sneakers in the rain", "sneakers in the rain"),
+    ],
+)
+def test_terms_and_inflections_are_rewritten(prompt, expected):
+    text, hits = FILTER.sanitize(prompt)
+    assert text == expected
+    assert hits
@@ -0,0 +1,50 @@
+"""Parsing the Quality Reviewer's verdict and category scores."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "review, approved",
+    [
+        ("APPROVED\nOverall: 8/10", True),
+        ("**APPROVED** — ready to publish", True),
+        ("Verdict: APPROVED", True),
+        ("APPROVED. There are no REVISION_NEEDED items left.", True),
+        ("REVISION_NEEDED\nThe caption is weak.", False),
+        ("NOT APPROVED. Revision needed.", False),
+        ("The draft cannot be APPROVED yet.", False),
+        ("", False),
+    ],
+)
+def test_verdict_is_the_first_word(review, approved):
+    assert app._is_approved(review) is approved
+
+
+def test_scores_are_read_from_n_out_of_10():
+    review = (
+        "REVISION_NEEDED\n"
+        "Art Concept: 8/10\n"
+        "**Prompt Quality** — 6.5 / 10\n"
+        "| Copy Quality | 2 typos in the caption, otherwise 7/10 |\n"
+        "Sensitivity (1-10): 9/10\n"
+        "Engagement Potential: strong hook\n"
+    )
+    assert app._parse_category_scores(review) == {
+        "Art Concept": 8.0,
+        "Prompt Quality": 6.5,
+        "Copy Quality": 7.0,
+        "Sensitivity": 9.0,
+    }
+
+
+def test_stray_numbers_do_not_route_revisions():
+    scores = app._parse_category_scores("Copy Quality: 2 typos to fix, 8/10\nArt Concept: 4/10")
+    assert scores == {"Copy Quality": 8.0, "Art Concept": 4.0}
+    assert app._revision_stages(scores)[0] == "CreativeDirector"
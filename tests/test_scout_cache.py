@@ -0,0 +1,137 @@
+"""NewsScout cache: TTL, stale-while-revalidate and shared fetches."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Fetcher:
+    """Counts calls and returns "scan 1", "scan 2", ... after an optional gate opens."""
+
+    def __init__(self, gate: asyncio.Event | None = None):
+        self.calls = 0
+        self.gate = gate
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        if self.gate is not None:
+            await self.gate.wait()
+        return f"scan {call}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(app.time, "time", clock)
+    return clock
+
+
+def test_entries_are_served_until_the_ttl_expires(clock):
+    cache = app.ScoutCache(ttl=60)
+    fetch = Fetcher()
+
+    async def scenario():
+        results = [await cache.get("k", fetch)]
+        clock.now += 60
+        results.append(await cache.get("k", fetch))
+        clock.now += 1
+        results.append(await cache.get("k", fetch))
+        return results
+
+    assert asyncio.run(scenario()) == [("scan 1", "miss"), ("scan 1", "hit"), ("scan 2", "miss")]
+    assert fetch.calls == 2
+
+
+def test_stale_entries_are_served_while_one_refresh_runs(clock):
+    cache = app.ScoutCache(ttl=60, stale=300)
+
+    async def scenario():
+        gate = asyncio.Event()
+        fetch = Fetcher(gate)
+        gate.set()
+        first = await cache.get("k", fetch)
+        gate.clear()
+        clock.now += 120
+        stale = [await cache.get("k", fetch), await cache.get("k", fetch)]
+        await asyncio.sleep(0)
+        assert fetch.calls == 2  # one background refresh for both stale lookups
+        gate.set()
+        await asyncio.gather(*cache._inflight.values())
+        return first, stale, await cache.get("k", fetch), fetch.calls
+
+    first, stale, refreshed, calls = asyncio.run(scenario())
+
+    assert first == ("scan 1", "miss")
+    assert stale == [("scan 1", "stale"), ("scan 1", "stale")]
+    assert refreshed == ("scan 2", "hit")
+    assert calls == 2
+
+
+def test_entries_past_the_stale_window_are_refetched(clock):
+    cache = app.ScoutCache(ttl=60, stale=300)
+    fetch = Fetcher()
+
+    async def scenario():
+        await cache.get("k", fetch)
+        clock.now += 361
+        return await cache.get("k", fetch)
+
+    assert asyncio.run(scenario()) == ("scan 2", "miss")
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    cache = app.ScoutCache(ttl=60)
+
+    async def scenario():
+        gate = asyncio.Event()
+        fetch = Fetcher(gate)
+        lookups = [asyncio.create_task(cache.get("k", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(*lookups), fetch.calls
+
+    results, calls = asyncio.run(scenario())
+
+    assert results == [("scan 1", "miss"), ("scan 1", "joined"), ("scan 1", "joined")]
+    assert calls == 1
+
+
+def test_empty_and_failed_fetches_are_not_cached(clock):
+    cache = app.ScoutCache(ttl=60)
+
+    async def empty():
+        return ""
+
+    async def failing():
+        raise RuntimeError("scout down")
+
+    async def scenario():
+        assert await cache.get("k", empty) == ("", "miss")
+        with pytest.raises(RuntimeError):
+            await cache.get("k", failing)
+        return await cache.get("k", Fetcher())
+
+    assert asyncio.run(scenario()) == ("scan 1", "miss")
+
+
+def test_entries_persist_across_instances(clock, tmp_path):
+    asyncio.run(app.ScoutCache(ttl=60, directory=tmp_path).get("k", Fetcher()))
+    fetch = Fetcher()
+
+    assert asyncio.run(app.ScoutCache(ttl=60, directory=tmp_path).get("k", fetch)) == ("scan 1", "hit")
+    assert fetch.calls == 0
@@ -0,0 +1,79 @@
+"""Stage memo: in-memory LRU, SQLite tier and its size cap."""
+
+import asyncio
+import itertools
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def ticking_clock(monkeypatch):
+    """Strictly increasing time.time(), so access order is never a tie."""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(app.time, "time", lambda: float(next(ticks)))
+
+
+def _run(cache, *steps):
+    """Apply ("put", key, text) / ("get", key) steps; returns the get results."""
+
+    async def scenario():
+        results = []
+        for step in steps:
+            if step[0] == "put":
+                await cache.put(step[1], "NewsAnalyst", step[2])
+            else:
+                results.append(await cache.get(step[1]))
+        return results
+
+    return asyncio.run(scenario())
+
+
+def test_memory_tier_evicts_the_least_recently_used_entry():
+    cache = app.StageCache(memory_entries=2)
+
+    results = _run(
+        cache,
+        ("put", "a", "A"), ("put", "b", "B"), ("get", "a"), ("put", "c", "C"),
+        ("get", "a"), ("get", "b"), ("get", "c"),
+    )
+
+    assert results == [("A", "memory"), ("A", "memory"), (None, "miss"), ("C", "memory")]
+
+
+def test_disk_tier_backs_the_memory_tier_and_survives_restarts(tmp_path):
+    db = tmp_path / "stages.db"
+    cache = app.StageCache(memory_entries=1, db_path=db)
+
+    assert _run(cache, ("put", "a", "A"), ("put", "b", "B"), ("get", "a"), ("get", "a")) == [
+        ("A", "disk"),
+        ("A", "memory"),
+    ]
+    assert _run(app.StageCache(db_path=db), ("get", "b")) == [("B", "disk")]
+
+
+def test_disk_tier_is_capped_by_size_least_recently_used_first(tmp_path):
+    cache = app.StageCache(memory_entries=0, db_path=tmp_path / "stages.db", max_bytes=10)
+
+    results = _run(
+        cache,
+        ("put", "a", "aaaa"), ("put", "b", "bbbb"), ("get", "a"), ("put", "c", "cccc"),
+        ("get", "a"), ("get", "b"), ("get", "c"),
+    )
+
+    assert results == [("aaaa", "disk"), ("aaaa", "disk"), (None, "miss"), ("cccc", "disk")]
+    rows = cache._connect().execute("SELECT SUM(size) FROM stage_outputs").fetchone()
+    assert rows[0] <= 10
+
+
+def test_editing_a_spec_drops_that_stages_entries(tmp_path, monkeypatch):
+    db = tmp_path / "stages.db"
+    _run(app.StageCache(db_path=db), ("put", "a", "A"))
+    monkeypatch.setattr(app, "_spec_digest", lambda stage: "edited")
+
+    assert _run(app.StageCache(db_path=db), ("get", "a")) == [(None, "miss")]
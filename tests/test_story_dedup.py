@@ -0,0 +1,69 @@
+"""Merging near-duplicate News Scout stories."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+ARTEMIS_NASA = (
+    "NASA's Artemis II Crew Completes Historic Lunar Flyby",
+    "The four astronauts of Artemis II swung around the far side of the Moon on Monday, "
+    "the first crewed lunar flight in more than 50 years.",
+    "NASA (https://nasa.gov/artemis-ii)",
+)
+ARTEMIS_AP = (
+    "Artemis II Crew Completes Historic Flyby of the Moon",
+    "NASA's four Artemis II astronauts swung around the Moon's far side on Monday "
+    "in the first crewed lunar flight in over 50 years.",
+    "AP News (https://apnews.com/artemis)",
+)
+STARSHIP = (
+    "SpaceX Starship Completes First Orbital Flight",
+    "SpaceX's Starship rocket reached orbit for the first time on Monday and splashed down "
+    "in the Indian Ocean, a milestone for the company's plans to return humans to the Moon.",
+    "Reuters (https://reuters.com/starship)",
+)
+
+
+def _scout_output(*stories):
+    blocks = [
+        f"### {i}. {headline}\n- **Source**: {source}\n- **Summary**: {summary}\n"
+        for i, (headline, summary, source) in enumerate(stories, 1)
+    ]
+    return "Here are today's top stories:\n\n" + "\n".join(blocks)
+
+
+def _similarity(a, b):
+    signature = lambda story: app.minhash_signature(f"{story[0]} {story[1]}", shingle_size=1, words=True)
+    return app.minhash_similarity(signature(a), signature(b))
+
+
+def test_reworded_duplicates_are_merged_at_the_default_threshold():
+    assert _similarity(ARTEMIS_NASA, ARTEMIS_AP) >= app.STORY_DEDUP_THRESHOLD
+
+    text, kept, found = app.dedup_stories(_scout_output(ARTEMIS_NASA, ARTEMIS_AP), app.STORY_DEDUP_THRESHOLD)
+
+    assert (kept, found) == (1, 2)
+    assert ARTEMIS_NASA[0] in text and ARTEMIS_AP[0] not in text
+    assert "- **Also reported by**: AP News (https://apnews.com/artemis)" in text
+
+
+def test_distinct_stories_on_the_same_topic_are_kept():
+    assert _similarity(ARTEMIS_NASA, STARSHIP) < app.STORY_DEDUP_THRESHOLD
+
+    output = _scout_output(ARTEMIS_NASA, STARSHIP)
+    text, kept, found = app.dedup_stories(output, app.STORY_DEDUP_THRESHOLD)
+
+    assert (kept, found) == (2, 2)
+    assert text == output
+
+
+def test_clusters_keep_the_first_story_in_scout_order():
+    text, kept, found = app.dedup_stories(
+        _scout_output(STARSHIP, ARTEMIS_AP, ARTEMIS_NASA), app.STORY_DEDUP_THRESHOLD
+    )
+
+    assert (kept, found) == (2, 3)
+    assert STARSHIP[0] in text and ARTEMIS_AP[0] in text and ARTEMIS_NASA[0] not in text
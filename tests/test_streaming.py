@@ -0,0 +1,66 @@
+"""Token streaming reaches clients while the News Scout is still writing."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from agent_framework import (
+    AgentRunResponseUpdate,
+    AgentRunUpdateEvent,
+    ChatMessage,
+    ExecutorCompletedEvent,
+    Role,
+    TextContent,
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+from benchmark import FakeAgent, FakeImageClient, FakeReviewer  # noqa: E402
+
+
+class SlowStreamingAgent(FakeAgent):
+    """Streams its reply in chunks spread over `latency` seconds."""
+
+    async def run_stream(self, messages: list[ChatMessage], **kwargs):
+        chunks = 5
+        for i in range(chunks):
+            yield AgentRunResponseUpdate(
+                contents=[TextContent(text=f"{self.name} chunk {i}. ")], role=Role.ASSISTANT, author_name=self.name
+            )
+            await asyncio.sleep(self.latency / chunks)
+
+
+async def _scout_timings() -> tuple[float, float]:
+    """Seconds from the run start to the scout's first streamed chunk and to its completion."""
+    agent_kwargs = {"latency": 0.01, "jitter": 0.0, "output_tokens": 20, "seed": 0}
+    agents = {name: FakeAgent(name, **agent_kwargs) for name in app.AGENT_SPECS}
+    agents["NewsScout"] = SlowStreamingAgent("NewsScout", **{**agent_kwargs, "latency": 0.5})
+    agents["QualityReviewer"] = FakeReviewer([None], **agent_kwargs)
+    workflow = app.workflow_factory(agents, FakeImageClient(0.0))()
+
+    first_chunk = completed = None
+    started = time.perf_counter()
+    async for event in workflow.run_stream([ChatMessage(role=Role.USER, text="Create today's HeadlineArt.")]):
+        now = time.perf_counter() - started
+        if isinstance(event, AgentRunUpdateEvent) and event.executor_id == "NewsScout" and first_chunk is None:
+            first_chunk = now
+        elif isinstance(event, ExecutorCompletedEvent) and event.executor_id == "NewsScout":
+            completed = now
+    return first_chunk, completed
+
+
+def test_news_scout_streams_before_it_finishes(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "STREAM_TOKENS", True)
+    monkeypatch.setattr(app, "SCOUT_CACHE", None)
+    monkeypatch.setattr(app, "STAGE_OUTPUT_CACHE", None)
+    monkeypatch.setattr(app, "GALLERY_MANIFEST", None)
+    monkeypatch.setattr(app, "IMAGE_REUSE_CACHE", None)
+    monkeypatch.setattr(app, "IMAGE_SCHEDULER", app.ImageScheduler(0))
+    monkeypatch.setattr(app, "OUTPUT_DIR", tmp_path)
+
+    first_chunk, completed = asyncio.run(_scout_timings())
+
+    assert first_chunk is not None and completed is not None
+    assert first_chunk < completed - 0.3
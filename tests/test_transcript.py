@@ -0,0 +1,82 @@
+"""Run transcript: control-marker lookups, copy-on-write forks and budgeted compaction."""
+
+import asyncio
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+from agent_framework import ChatMessage, Role
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+from benchmark import FakeAgent, FakeImageClient, FakeReviewer  # noqa: E402
+
+
+def _output(stage: str, text: str) -> ChatMessage:
+    return ChatMessage(role=Role.ASSISTANT, text=text, author_name=stage)
+
+
+def test_control_markers_and_forks():
+    transcript = app.Transcript([ChatMessage(role=Role.USER, text="go"), _output("Copywriter", "v1")])
+    transcript.append(ChatMessage(role=Role.USER, text=f"{app.REVISION_MARKER} REQUESTED — Cycle 1 — Rerun: Copywriter]"))
+    assert transcript.control() == app.REVISION_MARKER
+
+    fork = copy.deepcopy(transcript)
+    fork.append(ChatMessage(role=Role.USER, text=f"{app.FINAL_APPROVED_MARKER}\n\nok"))
+    assert fork[1] is transcript[1]
+    assert (len(transcript), transcript.control()) == (3, app.REVISION_MARKER)
+    assert fork.latest(app.FINAL_APPROVED_MARKER).text.endswith("ok")
+    with pytest.raises(TypeError):
+        transcript[0] = fork[0]
+
+
+def test_compaction_keeps_latest_outputs(monkeypatch):
+    monkeypatch.setattr(app, "TRANSCRIPT_TOKEN_BUDGET", 100)
+    transcript = app.Transcript([ChatMessage(role=Role.USER, text="go")])
+    for version in range(3):
+        transcript.append(_output("Copywriter", f"draft {version}. " + "x" * 400))
+    assert [m.text.startswith("[Superseded") for m in transcript] == [False, True, True, False]
+    assert transcript.latest("Copywriter").text.startswith("draft 2.")
+
+
+class _RecordingReviewer(FakeReviewer):
+    """Records the size of the transcript it is asked to review."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reviewed: list[int] = []
+
+    def _reply(self, messages: list[ChatMessage]) -> str:
+        self.reviewed.append(len(messages))
+        return super()._reply(messages)
+
+
+def _reviewed_lengths(budget: int) -> list[int]:
+    kwargs = {"latency": 0.0, "jitter": 0.0, "output_tokens": 100, "seed": 0}
+    agents = {name: FakeAgent(name, **kwargs) for name in app.AGENT_SPECS}
+    reviewer = agents["QualityReviewer"] = _RecordingReviewer([["Art Concept"], ["Art Concept"], None], **kwargs)
+    app.TRANSCRIPT_TOKEN_BUDGET = budget
+    workflow = app.workflow_factory(agents, FakeImageClient(0.0))()
+    asyncio.run(workflow.run([ChatMessage(role=Role.USER, text="Create today's HeadlineArt.")]))
+    return reviewer.reviewed
+
+
+def test_parallel_branches_merge_under_a_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "TOPOLOGY", "parallel")
+    monkeypatch.setattr(app, "TRANSCRIPT_TOKEN_BUDGET", 0)
+    monkeypatch.setattr(app, "SCOUT_CACHE", None)
+    monkeypatch.setattr(app, "STAGE_OUTPUT_CACHE", None)
+    monkeypatch.setattr(app, "GALLERY_MANIFEST", None)
+    monkeypatch.setattr(app, "IMAGE_REUSE_CACHE", None)
+    monkeypatch.setattr(app, "IMAGE_SCHEDULER", app.ImageScheduler(0))
+    monkeypatch.setattr(app, "OUTPUT_DIR", tmp_path)
+
+    unbounded = _reviewed_lengths(0)
+    compacted_before = sum(app.METRICS.series("headlineart_transcript_compacted_total").values())
+    budgeted = _reviewed_lengths(600)
+
+    assert len(unbounded) == 3
+    assert budgeted == unbounded  # same merged transcript, no duplicated branch output
+    assert sum(app.METRICS.series("headlineart_transcript_compacted_total").values()) > compacted_before